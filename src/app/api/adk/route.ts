@@ -1,4 +1,5 @@
 import { NextRequest, NextResponse } from "next/server";
+import { createClient } from "@/lib/supabase";
 
 function tryParseLLMJson(input: unknown): unknown {
   try {
@@ -191,11 +192,50 @@ export async function POST(request: NextRequest) {
       videoUri: !!videoUri,
     });
 
-    const backendResponse = await fetch("http://localhost:2000/agent/run", {
+    // Admission control: the backend schedules runs per tenant and priority lane.
+    const supabase = await createClient();
+    const {
+      data: { user },
+    } = await supabase.auth.getUser();
+    const priority = formData.get("priority") === "batch" ? "batch" : "interactive";
+    // The backend stops early enough to answer (possibly with partial results)
+    // before this proxy gives up on it.
+    const timeoutMs = Number(process.env.BACKEND_TIMEOUT_MS) || 300_000;
+    const backendHeaders: Record<string, string> = {
+      "X-Tenant-ID": user?.id ?? "anonymous",
+      "X-Priority": priority,
+      "X-Request-Timeout": String(Math.floor(timeoutMs / 1000)),
+    };
+    if (process.env.ADMISSION_SHARED_SECRET) {
+      backendHeaders["X-Admission-Token"] = process.env.ADMISSION_SHARED_SECRET;
+    }
+
+    // `?fields=` lets callers skip the large narrative parts of the result.
+    const backendUrl = new URL("http://localhost:2000/agent/run");
+    const fields = request.nextUrl.searchParams.get("fields");
+    if (fields) {
+      backendUrl.searchParams.set("fields", fields);
+    }
+
+    const backendResponse = await fetch(backendUrl, {
       method: "POST",
+      headers: backendHeaders,
       body: backendFormData,
+      // Closing the backend connection (browser gone or timeout) cancels the run.
+      signal: AbortSignal.any([request.signal, AbortSignal.timeout(timeoutMs)]),
     });
 
+    if (backendResponse.status === 429) {
+      const retryAfter = backendResponse.headers.get("Retry-After");
+      return NextResponse.json(
+        { ok: false, error: "Too many runs in progress; please retry shortly" },
+        {
+          status: 429,
+          headers: retryAfter ? { "Retry-After": retryAfter } : undefined,
+        }
+      );
+    }
+
     if (!backendResponse.ok) {
       return NextResponse.json(
         { ok: false, error: "Backend request failed" },
@@ -214,6 +254,12 @@ export async function POST(request: NextRequest) {
     );
     return NextResponse.json(finalPayload);
   } catch (error) {
+    if (error instanceof DOMException && error.name === "TimeoutError") {
+      return NextResponse.json(
+        { ok: false, error: "Backend timed out" },
+        { status: 504 }
+      );
+    }
     console.error("Proxy error:", error);
     return NextResponse.json(
       { ok: false, error: "Internal server error" },
@@ -0,0 +1,162 @@
+"""Per-tenant admission control for agent runs.
+
+Every run is tagged with a Flow (tenant + priority lane). The Next.js proxy
+resolves the tenant from the Supabase session and forwards it in X-Tenant-ID
+along with X-Priority ("interactive" or "batch"). The flow then passes through
+three weighted-fair schedulers (see multi_tool_agent.rate_limit.FairScheduler):
+
+- runs: whole /agent/run requests, with a per-tenant concurrency cap and a
+  bounded per-tenant queue (HTTP 429 beyond it);
+- transcode: ffmpeg jobs, one slot per video segment;
+- llm: the shared model-call limiter.
+
+Interactive requests carry a much larger weight than batch ones, so batch
+backfill only uses capacity that interactive traffic leaves free.
+
+Configuration (environment):
+- ADMISSION_SHARED_SECRET: when set, tenant/priority headers are trusted only
+  if X-Admission-Token matches; otherwise the request runs as "anonymous".
+- ADMISSION_LANE_WEIGHTS: lane weights (default "interactive=8,batch=1").
+- TENANT_WEIGHTS: per-tenant weights, e.g. "acme=2,trial=0.5" (default 1).
+- MAX_CONCURRENT_RUNS: runs executing at once (default 8).
+- TENANT_MAX_CONCURRENT_RUNS: runs one tenant may execute at once (default 2).
+- TENANT_MAX_QUEUED_RUNS: runs one tenant may have waiting (default 20).
+- TENANT_RUNS_PER_HOUR: rolling hourly quota per tenant (default 0, unlimited).
+- TRANSCODE_CONCURRENCY: ffmpeg jobs at once (default min(4, CPU count)).
+"""
+
+import functools
+import hmac
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Mapping
+
+from multi_tool_agent.rate_limit import (
+    DEFAULT_LANE_WEIGHTS,
+    LANES,
+    FairScheduler,
+    Flow,
+    QueueFull,
+    weights_from_env,
+)
+
+TENANT_HEADER = "X-Tenant-ID"
+PRIORITY_HEADER = "X-Priority"
+TOKEN_HEADER = "X-Admission-Token"
+ANONYMOUS_TENANT = "anonymous"
+MAX_TENANT_ID_CHARS = 128
+
+
+class AdmissionRejected(Exception):
+    """The run was refused before doing any work (quota or queue limit)."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _int_env(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)) or str(default))
+
+
+def resolve_flow(headers: Mapping[str, str]) -> Flow:
+    """Builds the request's flow from the proxy-supplied headers."""
+    secret = os.getenv("ADMISSION_SHARED_SECRET")
+    if secret and not hmac.compare_digest(
+        headers.get(TOKEN_HEADER, "").encode("utf-8"), secret.encode("utf-8")
+    ):
+        return Flow(tenant=ANONYMOUS_TENANT, lane="batch")
+    tenant = (headers.get(TENANT_HEADER) or "").strip()[:MAX_TENANT_ID_CHARS]
+    lane = (headers.get(PRIORITY_HEADER) or "interactive").strip().lower()
+    return Flow(
+        tenant=tenant or ANONYMOUS_TENANT,
+        lane=lane if lane in LANES else "batch",
+    )
+
+
+class TenantQuota:
+    """Rolling-window run quota per tenant."""
+
+    def __init__(self, limit: int, window_sec: float = 3600.0):
+        self.limit = max(0, limit)
+        self.window_sec = window_sec
+        self._starts: Dict[str, Deque[float]] = defaultdict(deque)
+
+    def consume(self, tenant: str) -> float:
+        """Records a run for `tenant`, or raises AdmissionRejected if over quota.
+
+        Returns the recorded start, which `refund` takes back.
+        """
+        now = time.monotonic()
+        if not self.limit:
+            return now
+        starts = self._starts[tenant]
+        while starts and now - starts[0] >= self.window_sec:
+            starts.popleft()
+        if len(starts) >= self.limit:
+            retry_after = int(self.window_sec - (now - starts[0])) + 1
+            raise AdmissionRejected(
+                f"tenant {tenant!r} exceeded {self.limit} runs per "
+                f"{int(self.window_sec)}s",
+                retry_after=retry_after,
+            )
+        starts.append(now)
+        return now
+
+    def refund(self, tenant: str, started: float) -> None:
+        """Forgets a run recorded by `consume` that never started."""
+        starts = self._starts.get(tenant)
+        if starts and started in starts:
+            starts.remove(started)
+
+
+@functools.lru_cache(maxsize=1)
+def get_quota() -> TenantQuota:
+    return TenantQuota(_int_env("TENANT_RUNS_PER_HOUR", 0))
+
+
+@functools.lru_cache(maxsize=1)
+def get_run_scheduler() -> FairScheduler:
+    return FairScheduler(
+        _int_env("MAX_CONCURRENT_RUNS", 8),
+        lane_weights=weights_from_env("ADMISSION_LANE_WEIGHTS", DEFAULT_LANE_WEIGHTS),
+        tenant_weights=weights_from_env("TENANT_WEIGHTS"),
+        max_per_tenant=_int_env("TENANT_MAX_CONCURRENT_RUNS", 2),
+        max_waiting_per_tenant=_int_env("TENANT_MAX_QUEUED_RUNS", 20),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_transcode_scheduler() -> FairScheduler:
+    return FairScheduler(
+        _int_env("TRANSCODE_CONCURRENCY", min(4, os.cpu_count() or 1)),
+        lane_weights=weights_from_env("ADMISSION_LANE_WEIGHTS", DEFAULT_LANE_WEIGHTS),
+        tenant_weights=weights_from_env("TENANT_WEIGHTS"),
+    )
+
+
+@asynccontextmanager
+async def admit(flow: Flow):
+    """Charges the tenant's quota, then holds a run slot for the block.
+
+    The quota is checked before queueing so over-quota requests fail fast
+    without taking a place in the queue. Requests that never get a slot (full
+    queue, or cancelled while waiting) are refunded.
+    """
+    quota = get_quota()
+    started = quota.consume(flow.tenant)
+    scheduler = get_run_scheduler()
+    try:
+        await scheduler.acquire(flow)
+    except QueueFull as e:
+        quota.refund(flow.tenant, started)
+        raise AdmissionRejected(str(e)) from e
+    except BaseException:
+        quota.refund(flow.tenant, started)
+        raise
+    try:
+        yield
+    finally:
+        scheduler.release(flow)
@@ -0,0 +1,274 @@
+"""Deterministic local stand-in for the Gemini API (generativelanguage v1beta).
+
+Point the backend at it with GOOGLE_GEMINI_BASE_URL=http://127.0.0.1:<port>
+(google-genai honours this variable) and any GOOGLE_API_KEY. Responses are
+chosen from the request's response schema:
+- PersonaMiniSchema (mainCat/retention/viewed/liked) -> a persona verdict
+- outputSchema (single "output" string)              -> a merger report
+- anything else                                      -> a transcript
+
+Behaviour is controlled by environment variables so it can run as its own
+process (`uvicorn bench.fake_gemini:app --port 8765`):
+- FAKE_GEMINI_LATENCY_MS: mean latency per call (default 300)
+- FAKE_GEMINI_JITTER_MS: +/- uniform jitter (default 100)
+- FAKE_GEMINI_TAIL_RATE / FAKE_GEMINI_TAIL_MS: fraction of calls that take
+  an extra TAIL_MS, to model stragglers (default 0 / 5000)
+- FAKE_GEMINI_429_RATE: fraction of calls rejected with RESOURCE_EXHAUSTED
+- FAKE_GEMINI_PREFILL_MS_PER_1K: extra latency per 1k uncached prompt tokens,
+  to model time-to-first-token (default 0)
+- FAKE_GEMINI_SEED: seed for the deterministic RNG (default 0)
+
+Explicit context caches (`cachedContents`) are emulated in memory: tokens in a
+referenced cache are reported as cachedContentTokenCount and skip prefill.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)) or default)
+
+
+class FakeGeminiConfig:
+    def __init__(self):
+        self.latency_ms = _env_float("FAKE_GEMINI_LATENCY_MS", 300)
+        self.jitter_ms = _env_float("FAKE_GEMINI_JITTER_MS", 100)
+        self.tail_rate = _env_float("FAKE_GEMINI_TAIL_RATE", 0)
+        self.tail_ms = _env_float("FAKE_GEMINI_TAIL_MS", 5000)
+        self.rate_429 = _env_float("FAKE_GEMINI_429_RATE", 0)
+        self.prefill_ms_per_1k = _env_float("FAKE_GEMINI_PREFILL_MS_PER_1K", 0)
+        self.seed = int(os.getenv("FAKE_GEMINI_SEED", "0") or "0")
+
+
+config = FakeGeminiConfig()
+app = FastAPI(title="Fake Gemini", version="0.1.0")
+stats: Dict[str, int] = {
+    "calls": 0,
+    "rejected_429": 0,
+    "caches_created": 0,
+    "caches_deleted": 0,
+    "cached_calls": 0,
+}
+cached_contents: Dict[str, Dict[str, Any]] = {}
+# Occurrences per request key, so identical requests (retries, hedged
+# duplicates) still draw independent latencies.
+_key_counts: Dict[str, int] = {}
+
+
+def _agent_name(body: Dict[str, Any]) -> str:
+    labels = body.get("labels") or (body.get("generationConfig") or {}).get("labels")
+    if isinstance(labels, dict) and labels.get("adk_agent_name"):
+        return str(labels["adk_agent_name"])
+    system = body.get("systemInstruction") or {}
+    for part in system.get("parts") or []:
+        if part.get("text"):
+            return hashlib.sha256(part["text"].encode("utf-8")).hexdigest()[:12]
+    return "-"
+
+
+def _rng_for(body: Dict[str, Any]) -> random.Random:
+    """Per-call RNG keyed by the request body and agent, so a given workload
+    replays identically for a fixed seed whatever order concurrent calls
+    arrive in. Only repeats of the same request share a counter.
+
+    The cache name is left out of the key: it is random per run.
+    """
+    stable = {k: v for k, v in body.items() if k != "cachedContent"}
+    digest = hashlib.sha256(
+        json.dumps(stable, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+    key = f"{digest}:{_agent_name(body)}"
+    _key_counts[key] = _key_counts.get(key, 0) + 1
+    return random.Random(f"{config.seed}:{key}:{_key_counts[key]}")
+
+
+def _estimate_tokens(body: Dict[str, Any]) -> int:
+    chars = 0
+    media_bytes = 0
+    for content in body.get("contents") or []:
+        for part in content.get("parts") or []:
+            if "text" in part:
+                chars += len(part["text"] or "")
+            if "inlineData" in part:
+                media_bytes += len((part["inlineData"] or {}).get("data") or "")
+    system = body.get("systemInstruction") or {}
+    for part in system.get("parts") or []:
+        chars += len(part.get("text") or "")
+    # ~4 chars/token for text; video is billed per second, approximate by size.
+    return chars // 4 + media_bytes // 1000
+
+
+def _persona(rng: random.Random) -> Dict[str, Any]:
+    retention = round(rng.uniform(0.05, 0.95), 3)
+    return {
+        "mainCat": rng.choice(["Music", "Gaming", "Technology", "Sports", "Learning"]),
+        "retention": retention,
+        "viewed": retention > 0.3,
+        "liked": retention > 0.6,
+    }
+
+
+def _report(rng: random.Random) -> Dict[str, Any]:
+    retention = round(rng.uniform(0.2, 0.8), 3)
+    report = {
+        "video": {
+            "title": "Benchmark clip",
+            "category": "Technology",
+            "length_sec": 30,
+        },
+        "metrics": {
+            "estimated_view_count": rng.randint(1_000, 100_000),
+            "estimated_like_count": rng.randint(10, 5_000),
+            "estimated_dislike_count": rng.randint(0, 500),
+            "avg_retention_rate": retention,
+            "avg_watch_time_sec": int(30 * retention),
+            "viewing_likelihood": round(rng.random(), 3),
+            "like_probability": round(rng.random(), 3),
+            "dislike_probability": round(rng.random() / 5, 3),
+        },
+        "personas": [],
+        "audience_segments": [],
+        "target_demographics": [],
+        "retention": {
+            "high_retention_segments": ["intro"],
+            "low_retention_segments": ["outro"],
+            "key_dropoff_timestamps_sec": [rng.randint(1, 30)],
+        },
+        "suggestions": {
+            "top_actions": ["Tighten the hook"],
+            "thumbnail_titles_to_test": ["You won't believe this"],
+            "hook_scripts": ["Wait for it..."],
+        },
+        "advertising": {
+            "suitable_sponsors": [],
+            "ad_formats": [],
+            "integration_ideas": [],
+        },
+        "methodology": {"notes": "fake backend", "assumptions": []},
+    }
+    return {"output": json.dumps(report)}
+
+
+def _transcript(rng: random.Random) -> str:
+    words = ["hook", "demo", "product", "music", "crowd", "reaction", "tutorial"]
+    return "Transcript: " + " ".join(rng.choice(words) for _ in range(120))
+
+
+def _response_text(body: Dict[str, Any], rng: random.Random) -> str:
+    generation_config = json.dumps(body.get("generationConfig") or {})
+    if "mainCat" in generation_config:
+        return json.dumps(_persona(rng))
+    if '"output"' in generation_config:
+        return json.dumps(_report(rng))
+    return _transcript(rng)
+
+
+@app.get("/stats")
+def get_stats() -> Dict[str, int]:
+    return stats
+
+
+@app.post("/{version}/cachedContents")
+async def create_cached_content(version: str, request: Request):
+    body = await request.json()
+    name = f"cachedContents/{uuid.uuid4().hex[:16]}"
+    tokens = _estimate_tokens(body)
+    cached_contents[name] = {"tokens": tokens, "model": body.get("model")}
+    stats["caches_created"] += 1
+    return {
+        "name": name,
+        "model": body.get("model"),
+        "displayName": body.get("displayName"),
+        "usageMetadata": {"totalTokenCount": tokens},
+    }
+
+
+@app.delete("/{version}/cachedContents/{cache_id}")
+async def delete_cached_content(version: str, cache_id: str):
+    if cached_contents.pop(f"cachedContents/{cache_id}", None) is None:
+        return JSONResponse(
+            status_code=404,
+            content={
+                "error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}
+            },
+        )
+    stats["caches_deleted"] += 1
+    return {}
+
+
+@app.post("/{version}/models/{model_action:path}")
+async def generate_content(version: str, model_action: str, request: Request):
+    raw = await request.body()
+    body = json.loads(raw or b"{}")
+    rng = _rng_for(body)
+    model = model_action.split(":", 1)[0]
+    stats["calls"] += 1
+
+    prompt_tokens = _estimate_tokens(body)
+    cached_tokens = 0
+    cache_name = body.get("cachedContent")
+    if cache_name:
+        cache = cached_contents.get(cache_name)
+        if cache is None:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": {
+                        "code": 400,
+                        "message": f"CachedContent not found: {cache_name}",
+                        "status": "INVALID_ARGUMENT",
+                    }
+                },
+            )
+        cached_tokens = cache["tokens"]
+        stats["cached_calls"] += 1
+
+    delay_ms = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+    delay_ms += config.prefill_ms_per_1k * prompt_tokens / 1000
+    if rng.random() < config.tail_rate:
+        delay_ms += config.tail_ms
+    started = time.perf_counter()
+    await asyncio.sleep(max(delay_ms, 0) / 1000)
+
+    if rng.random() < config.rate_429:
+        stats["rejected_429"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={
+                "error": {
+                    "code": 429,
+                    "message": "Resource has been exhausted (e.g. check quota).",
+                    "status": "RESOURCE_EXHAUSTED",
+                }
+            },
+        )
+
+    text = _response_text(body, rng)
+    output_tokens = max(len(text) // 4, 1)
+    return {
+        "candidates": [
+            {
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }
+        ],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens + cached_tokens,
+            "cachedContentTokenCount": cached_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + cached_tokens + output_tokens,
+        },
+        "modelVersion": model,
+        "responseId": f"fake-{int(started * 1e6)}",
+    }
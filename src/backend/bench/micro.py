@@ -0,0 +1,77 @@
+"""Micro-benchmarks for CPU-bound pieces of the request path.
+
+Covers compress_video_bytes on the sample clips, the JSON extraction /
+normalisation helpers on synthetic agent output and result serialization
+(encode + gzip), so regressions there show up without running the whole
+pipeline.
+"""
+
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+
+def _median_seconds(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def synthetic_agent_text(personas: int = 27, seed: int = 0) -> str:
+    """Event text shaped like a real run: persona JSON between prose, plus a merger blob."""
+    rng = random.Random(seed)
+    chunks: List[str] = ["Transcript: " + "lorem ipsum " * 400]
+    for i in range(personas):
+        verdict = {
+            "mainCat": "Music",
+            "retention": round(rng.random(), 3),
+            "viewed": rng.random() > 0.5,
+            "liked": rng.random() > 0.5,
+        }
+        chunks.append(f"Reviewer {i} says {{not json}} then {json.dumps(verdict)}")
+    report = {
+        "metrics": {"avg_retention_rate": 0.5},
+        "personas": [],
+        "notes": "x" * 5000,
+    }
+    chunks.append(json.dumps({"output": json.dumps(report)}))
+    return "\n".join(chunks)
+
+
+def run_micro(sample_paths: Iterable[Path], repeat: int = 3) -> Dict[str, float]:
+    """Returns median seconds per micro-benchmark, keyed by name."""
+    import main
+    import serialization
+
+    results: Dict[str, float] = {}
+    text = synthetic_agent_text()
+    results["extract_json_objects"] = _median_seconds(
+        lambda: main._extract_json_objects_from_text(text), repeat * 10
+    )
+    merger_output = json.dumps({"output": json.dumps({"a": "b" * 20000})})
+    results["normalize_result_structure"] = _median_seconds(
+        lambda: main._normalize_result_structure(merger_output), repeat * 10
+    )
+    result = main._normalize_result_structure(merger_output)
+    results["dumps_result[json]"] = _median_seconds(
+        lambda: json.dumps(result, ensure_ascii=False, indent=2), repeat * 10
+    )
+    results["dumps_result[serialization]"] = _median_seconds(
+        lambda: serialization.dumps(result), repeat * 10
+    )
+    results["dumps_result[serialization+gzip]"] = _median_seconds(
+        lambda: serialization.compress(serialization.dumps(result), "gzip"),
+        repeat * 10,
+    )
+    for path in sample_paths:
+        data = path.read_bytes()
+        results[f"compress_video_bytes[{path.stem}]"] = _median_seconds(
+            lambda: main.compress_video_bytes(data, path.name, "mp4"), repeat
+        )
+    return results
@@ -0,0 +1,397 @@
+"""End-to-end benchmark and load test for POST /agent/run.
+
+Starts the fake Gemini backend (bench/fake_gemini.py) and the real FastAPI app
+in separate processes, drives /agent/run at each requested concurrency level
+and reports latency percentiles, throughput, peak RSS of the backend and a
+per-stage breakdown scraped from /metrics. No real model quota is used.
+
+Usage (from src/backend):
+  python -m bench.run_bench --concurrency 1 4 8 --requests 16
+  python -m bench.run_bench --samples tiny_240p_5s medium_720p_30s --latency-ms 800
+  python -m bench.run_bench --rate-429 0.05 --tail-rate 0.05
+  python -m bench.run_bench --save default       # write bench/baselines/default.json
+  python -m bench.run_bench --compare default    # exit 1 on regression
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from bench.micro import run_micro
+from bench.samples import SAMPLE_SPECS, ensure_samples
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+BASELINES_DIR = Path(__file__).parent / "baselines"
+
+# Histograms whose per-label mean is reported as the stage breakdown.
+BREAKDOWN_METRICS = {
+    "vega_stage_duration_seconds": "stage",
+    "vega_agent_duration_seconds": "agent",
+}
+
+HistogramTotals = Dict[Tuple[str, str], Tuple[float, float]]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start(module_app: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            module_app,
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"process for {url} exited with {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"timed out waiting for {url}")
+
+
+def _peak_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _scrape(client: httpx.Client, base_url: str) -> HistogramTotals:
+    totals: HistogramTotals = {}
+    text = client.get(f"{base_url}/metrics").text
+    for family in text_string_to_metric_families(text):
+        label = BREAKDOWN_METRICS.get(family.name)
+        if label is None:
+            continue
+        for sample in family.samples:
+            key = (label, sample.labels.get(label, ""))
+            total, count = totals.get(key, (0.0, 0.0))
+            if sample.name.endswith("_sum"):
+                totals[key] = (total + sample.value, count)
+            elif sample.name.endswith("_count"):
+                totals[key] = (total, count + sample.value)
+    return totals
+
+
+def _breakdown(before: HistogramTotals, after: HistogramTotals) -> Dict[str, float]:
+    """Mean seconds per stage/agent over the window between two scrapes."""
+    result = {}
+    for key, (total, count) in sorted(after.items()):
+        prev_total, prev_count = before.get(key, (0.0, 0.0))
+        if count > prev_count:
+            result[f"{key[0]}:{key[1]}"] = round(
+                (total - prev_total) / (count - prev_count), 4
+            )
+    return result
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+async def _drive(
+    base_url: str,
+    concurrency: int,
+    requests: int,
+    payloads: List[Optional[Path]],
+    tenants: int = 1,
+    batch_fraction: float = 0.0,
+) -> Tuple[List[float], int, List[str], float, Dict[str, List[float]]]:
+    latencies: List[float] = []
+    by_lane: Dict[str, List[float]] = {}
+    errors: List[str] = []
+    ok = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    blobs = {p: p.read_bytes() for p in payloads if p is not None}
+    interactive_tenants = max(1, tenants - 1 if batch_fraction else tenants)
+
+    async def one(i: int, client: httpx.AsyncClient):
+        nonlocal ok
+        sample = payloads[i % len(payloads)]
+        files = None
+        if sample is not None:
+            files = {"video": (sample.name, blobs[sample], "video/mp4")}
+        # Batch requests are spread evenly through the run and all come from the
+        # last tenant: one customer backfilling while the others work interactively.
+        is_batch = int((i + 1) * batch_fraction) > int(i * batch_fraction)
+        lane = "batch" if is_batch else "interactive"
+        tenant = tenants - 1 if is_batch else i % interactive_tenants
+        headers = {"X-Tenant-ID": f"bench-{tenant}", "X-Priority": lane}
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                resp = await client.post(
+                    f"{base_url}/agent/run",
+                    data={"prompt": "Benchmark run"},
+                    files=files,
+                    headers=headers,
+                )
+                body = resp.json()
+                if resp.status_code == 200 and body.get("ok"):
+                    ok += 1
+                else:
+                    errors.append(str(body.get("error") or resp.status_code)[:200])
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}"[:200])
+            latencies.append(time.perf_counter() - start)
+            by_lane.setdefault(lane, []).append(latencies[-1])
+
+    async with httpx.AsyncClient(timeout=600.0) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i, client) for i in range(requests)))
+        wall = time.perf_counter() - started
+    return latencies, ok, errors, wall, by_lane
+
+
+def run(args: argparse.Namespace) -> dict:
+    samples: List[Optional[Path]] = [None]
+    if args.samples != ["none"]:
+        samples = list(ensure_samples(args.samples))
+
+    fake_port, backend_port = _free_port(), _free_port()
+    fake_env = dict(
+        os.environ,
+        FAKE_GEMINI_LATENCY_MS=str(args.latency_ms),
+        FAKE_GEMINI_JITTER_MS=str(args.jitter_ms),
+        FAKE_GEMINI_429_RATE=str(args.rate_429),
+        FAKE_GEMINI_TAIL_RATE=str(args.tail_rate),
+        FAKE_GEMINI_TAIL_MS=str(args.tail_ms),
+        FAKE_GEMINI_PREFILL_MS_PER_1K=str(args.prefill_ms_per_1k),
+        FAKE_GEMINI_SEED=str(args.seed),
+    )
+    data_dir = tempfile.mkdtemp(prefix="vega-bench-")
+    backend_env = dict(
+        os.environ,
+        GOOGLE_GEMINI_BASE_URL=f"http://127.0.0.1:{fake_port}",
+        GOOGLE_API_KEY="fake-key",
+        GOOGLE_GENAI_USE_VERTEXAI="0",
+        VEGA_DATA_DIR=data_dir,
+        LOG_LEVEL="WARNING",
+    )
+
+    fake = _start("bench.fake_gemini:app", fake_port, fake_env)
+    backend = _start("main:app", backend_port, backend_env)
+    base_url = f"http://127.0.0.1:{backend_port}"
+    report = {
+        "config": {
+            "samples": [p.name if p else None for p in samples],
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "rate_429": args.rate_429,
+            "tail_rate": args.tail_rate,
+            "prefill_ms_per_1k": args.prefill_ms_per_1k,
+            "context_cache": os.getenv("CONTEXT_CACHE", "1") != "0",
+            "llm_hedging": os.getenv("LLM_HEDGING", "0") == "1",
+            "seed": args.seed,
+            "tenants": args.tenants,
+            "batch_fraction": args.batch_fraction,
+        },
+        "levels": [],
+    }
+    try:
+        _wait_ready(f"http://127.0.0.1:{fake_port}/stats", fake)
+        _wait_ready(f"{base_url}/health", backend)
+        with httpx.Client(timeout=10.0) as client:
+            # Warm-up builds the agent graph so it is not billed to the first level.
+            asyncio.run(_drive(base_url, 1, 1, [None]))
+            for concurrency in args.concurrency:
+                before = _scrape(client, base_url)
+                latencies, ok, errors, wall, by_lane = asyncio.run(
+                    _drive(
+                        base_url,
+                        concurrency,
+                        args.requests,
+                        samples,
+                        args.tenants,
+                        args.batch_fraction,
+                    )
+                )
+                after = _scrape(client, base_url)
+                latencies.sort()
+                level = {
+                    "concurrency": concurrency,
+                    "requests": args.requests,
+                    "ok": ok,
+                    "errors": len(errors),
+                    "p50_s": round(_percentile(latencies, 50), 4),
+                    "p95_s": round(_percentile(latencies, 95), 4),
+                    "p99_s": round(_percentile(latencies, 99), 4),
+                    "rps": round(args.requests / wall, 4) if wall else 0.0,
+                    "peak_rss_mb": _peak_rss_mb(backend.pid),
+                    "lanes": {
+                        lane: {
+                            "requests": len(values),
+                            "p50_s": round(_percentile(sorted(values), 50), 4),
+                            "p95_s": round(_percentile(sorted(values), 95), 4),
+                        }
+                        for lane, values in sorted(by_lane.items())
+                    },
+                    "stages": _breakdown(before, after),
+                    "sample_errors": sorted(set(errors))[:5],
+                }
+                report["levels"].append(level)
+                _print_level(level)
+        report["fake_backend"] = httpx.get(f"http://127.0.0.1:{fake_port}/stats").json()
+    finally:
+        for proc in (backend, fake):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    if args.micro:
+        micro_samples = [p for p in samples if p is not None]
+        report["micro"] = {
+            k: round(v, 5)
+            for k, v in run_micro(micro_samples, args.micro_repeat).items()
+        }
+        for name, seconds in report["micro"].items():
+            print(f"[MICRO] {name}: {seconds * 1000:.2f} ms")
+    return report
+
+
+def _print_level(level: dict) -> None:
+    print(
+        f"[c={level['concurrency']:>3}] ok={level['ok']}/{level['requests']} "
+        f"p50={level['p50_s']:.3f}s p95={level['p95_s']:.3f}s p99={level['p99_s']:.3f}s "
+        f"rps={level['rps']:.3f} peak_rss={level['peak_rss_mb']} MB"
+    )
+    if len(level.get("lanes", {})) > 1:
+        for lane, stats in level["lanes"].items():
+            print(
+                f"         lane {lane:<12} n={stats['requests']:<4} "
+                f"p50={stats['p50_s']:.3f}s p95={stats['p95_s']:.3f}s"
+            )
+    for name, seconds in level["stages"].items():
+        print(f"         {name:<48} {seconds:8.3f}s")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Lists metrics that regressed by more than `tolerance` (fractional) vs baseline."""
+    regressions = []
+    base_levels = {lvl["concurrency"]: lvl for lvl in baseline.get("levels", [])}
+    for level in report["levels"]:
+        base = base_levels.get(level["concurrency"])
+        if not base:
+            continue
+        for key in ("p50_s", "p95_s", "p99_s"):
+            if level[key] > base[key] * (1 + tolerance):
+                regressions.append(
+                    f"c={level['concurrency']} {key}: {base[key]} -> {level[key]}"
+                )
+        if level["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(
+                f"c={level['concurrency']} rps: {base['rps']} -> {level['rps']}"
+            )
+    for name, seconds in (report.get("micro") or {}).items():
+        base_seconds = (baseline.get("micro") or {}).get(name)
+        if base_seconds and seconds > base_seconds * (1 + tolerance):
+            regressions.append(f"micro {name}: {base_seconds} -> {seconds}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=8, help="requests per level")
+    parser.add_argument(
+        "--samples",
+        nargs="+",
+        default=["tiny_240p_5s", "short_480p_15s"],
+        help=f"sample clips ({', '.join(SAMPLE_SPECS)}) or 'none' for prompt-only",
+    )
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--tail-rate", type=float, default=0.0)
+    parser.add_argument("--tail-ms", type=float, default=5000)
+    parser.add_argument(
+        "--prefill-ms-per-1k",
+        type=float,
+        default=0.0,
+        help="fake prefill latency per 1k uncached prompt tokens",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--tenants", type=int, default=1, help="spread requests across N tenants"
+    )
+    parser.add_argument(
+        "--batch-fraction",
+        type=float,
+        default=0.0,
+        help="share of requests sent in the batch lane by the last tenant",
+    )
+    parser.add_argument(
+        "--micro", action="store_true", help="also run micro-benchmarks"
+    )
+    parser.add_argument("--micro-repeat", type=int, default=3)
+    parser.add_argument("--save", metavar="NAME", help="save report as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--output", type=Path, help="also write the report here")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.save:
+        BASELINES_DIR.mkdir(parents=True, exist_ok=True)
+        path = BASELINES_DIR / f"{args.save}.json"
+        path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[DONE] Saved baseline to {path}")
+    if args.compare:
+        baseline = json.loads(
+            (BASELINES_DIR / f"{args.compare}.json").read_text(encoding="utf-8")
+        )
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"[REGRESSION] {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"[DONE] No regressions beyond {args.tolerance:.0%} vs {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Synthetic sample videos for benchmarks, generated with ffmpeg on demand.
+
+Clips use ffmpeg's testsrc2 pattern plus a sine tone, so they encode like
+real footage (motion, audio) without shipping binaries in the repo. They are
+cached under bench/samples/ and regenerated only when missing.
+"""
+
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+SAMPLES_DIR = Path(__file__).parent / "samples"
+
+
+@dataclass(frozen=True)
+class SampleSpec:
+    name: str
+    width: int
+    height: int
+    duration_sec: int
+    fps: int = 30
+
+
+SAMPLE_SPECS: Dict[str, SampleSpec] = {
+    spec.name: spec
+    for spec in (
+        SampleSpec("tiny_240p_5s", 426, 240, 5),
+        SampleSpec("short_480p_15s", 854, 480, 15),
+        SampleSpec("medium_720p_30s", 1280, 720, 30),
+        SampleSpec("long_1080p_60s", 1920, 1080, 60),
+        SampleSpec("vertical_1080x1920_20s", 1080, 1920, 20),
+        SampleSpec("overlong_480p_150s", 854, 480, 150, fps=24),
+    )
+}
+
+
+def sample_path(spec: SampleSpec) -> Path:
+    return SAMPLES_DIR / f"{spec.name}.mp4"
+
+
+def generate_sample(spec: SampleSpec, force: bool = False) -> Path:
+    path = sample_path(spec)
+    if path.exists() and not force:
+        return path
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg is required to generate benchmark samples")
+    SAMPLES_DIR.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc2=size={spec.width}x{spec.height}:rate={spec.fps}:duration={spec.duration_sec}",
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency=440:sample_rate=44100:duration={spec.duration_sec}",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-crf",
+        "28",
+        "-pix_fmt",
+        "yuv420p",
+        "-c:a",
+        "aac",
+        "-shortest",
+        str(path),
+    ]
+    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return path
+
+
+def ensure_samples(names: Optional[Iterable[str]] = None) -> List[Path]:
+    """Returns paths for the requested samples (all by default), generating as needed."""
+    specs = [SAMPLE_SPECS[n] for n in names] if names else list(SAMPLE_SPECS.values())
+    return [generate_sample(spec) for spec in specs]
+
+
+if __name__ == "__main__":
+    for p in ensure_samples():
+        print(f"[SAMPLE] {p.name} bytes={p.stat().st_size}")
@@ -0,0 +1,191 @@
+"""Run-scoped explicit context caching for the reviewer fan-out.
+
+Every `{archetype}_{level}_reviewer` sees the same conversation (the user's
+video/prompt plus the transcriber's output) and differs only in its system
+instruction. The first reviewer of a run registers that shared conversation
+as Gemini cached content; every reviewer then sends only its own instruction
+and references the cache. Caches are deleted when the run ends, including runs
+cut short by the deadline or a disconnect (see deadlines.release_invocations),
+with a TTL as backstop for processes that die mid-run.
+
+Configuration (environment):
+- CONTEXT_CACHE: "1" (default) to enable, "0" to disable.
+- CONTEXT_CACHE_MIN_TOKENS: skip prefixes estimated below this size, since the
+  API rejects small caches (default 4096).
+- CONTEXT_CACHE_TTL_SEC: cache TTL (default 600).
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from google.genai import Client, types
+
+# ADK
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.adk.plugins.base_plugin import BasePlugin
+
+from metrics import CONTEXT_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def _enabled() -> bool:
+    return os.getenv("CONTEXT_CACHE", "1") != "0"
+
+
+def estimate_tokens(contents: List[types.Content]) -> int:
+    """Rough token estimate: ~4 chars per text token, ~1 token per KB of media."""
+    chars = 0
+    media_bytes = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.inline_data is not None and part.inline_data.data:
+                media_bytes += len(part.inline_data.data)
+    return chars // 4 + media_bytes // 1000
+
+
+def prefix_fingerprint(model: str, contents: List[types.Content]) -> str:
+    digest = hashlib.sha256(model.encode("utf-8"))
+    for content in contents:
+        digest.update(f"|{content.role}|".encode("utf-8"))
+        for part in content.parts or []:
+            if part.text:
+                digest.update(part.text.encode("utf-8"))
+            elif part.inline_data is not None:
+                digest.update((part.inline_data.mime_type or "").encode("utf-8"))
+                digest.update(part.inline_data.data or b"")
+            else:
+                digest.update(part.model_dump_json(exclude_none=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ContextCachePlugin(BasePlugin):
+    """Registers the reviewers' shared prefix once per run and points calls at it."""
+
+    def __init__(
+        self,
+        name: str = "context_cache",
+        agent_suffix: str = "_reviewer",
+        client: Optional[Client] = None,
+    ):
+        super().__init__(name)
+        self.agent_suffix = agent_suffix
+        self._client = client
+        # invocation_id -> prefix fingerprint -> future resolving to the cache name
+        # (or None when creation failed, so the run falls back to full requests).
+        self._caches: Dict[str, Dict[str, asyncio.Future]] = defaultdict(dict)
+
+    @property
+    def client(self) -> Client:
+        if self._client is None:
+            # Honours GOOGLE_API_KEY / GOOGLE_GENAI_USE_VERTEXAI / GOOGLE_GEMINI_BASE_URL
+            # exactly like the ADK Gemini model does.
+            self._client = Client()
+        return self._client
+
+    def _cacheable(self, agent_name: str, llm_request: LlmRequest) -> bool:
+        config = llm_request.config
+        if not _enabled() or not agent_name.endswith(self.agent_suffix):
+            return False
+        if not llm_request.model or not llm_request.contents:
+            return False
+        # cached_content cannot be combined with per-call tools or a structured
+        # system instruction; those requests go out unchanged.
+        if config.tools or config.tool_config or config.cached_content:
+            return False
+        if config.system_instruction is not None and not isinstance(
+            config.system_instruction, str
+        ):
+            return False
+        min_tokens = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "4096") or "4096")
+        return estimate_tokens(llm_request.contents) >= min_tokens
+
+    async def _create(self, invocation_id: str, llm_request: LlmRequest) -> str:
+        ttl = int(os.getenv("CONTEXT_CACHE_TTL_SEC", "600") or "600")
+        cached = await self.client.aio.caches.create(
+            model=llm_request.model,
+            config=types.CreateCachedContentConfig(
+                contents=llm_request.contents,
+                ttl=f"{ttl}s",
+                display_name=f"vega-{invocation_id}"[:128],
+            ),
+        )
+        logger.info(
+            "created context cache",
+            extra={"cache_name": cached.name, "invocation_id": invocation_id},
+        )
+        return cached.name
+
+    async def _cache_name(
+        self, invocation_id: str, llm_request: LlmRequest
+    ) -> Optional[str]:
+        key = prefix_fingerprint(llm_request.model, llm_request.contents)
+        entries = self._caches[invocation_id]
+        future = entries.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        entries[key] = future
+        name: Optional[str] = None
+        try:
+            name = await self._create(invocation_id, llm_request)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("context cache creation failed; sending full prompts: %s", e)
+        finally:
+            # Always resolve so concurrent reviewers waiting on it never hang.
+            if not future.done():
+                future.set_result(name)
+        return name
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ):
+        agent_name = callback_context.agent_name
+        if not self._cacheable(agent_name, llm_request):
+            CONTEXT_CACHE_REQUESTS.labels(agent=agent_name, outcome="skipped").inc()
+            return None
+
+        name = await self._cache_name(callback_context.invocation_id, llm_request)
+        if name is None:
+            CONTEXT_CACHE_REQUESTS.labels(agent=agent_name, outcome="failed").inc()
+            return None
+
+        # The persona instruction is the only per-reviewer part; send it as the
+        # sole uncached turn after the shared prefix.
+        instruction = llm_request.config.system_instruction
+        llm_request.config.system_instruction = None
+        llm_request.config.cached_content = name
+        llm_request.contents = (
+            [types.Content(role="user", parts=[types.Part(text=instruction)])]
+            if instruction
+            else []
+        )
+        CONTEXT_CACHE_REQUESTS.labels(agent=agent_name, outcome="hit").inc()
+        return None
+
+    async def release_invocation(self, invocation_id: str) -> None:
+        """Deletes the run's caches, waiting for any still being created.
+
+        Called in the background once the run ends (deadlines.release_invocations)
+        rather than from after_run_callback, which ADK awaits before the run's
+        event stream finishes and so would delay every response.
+        """
+        entries = self._caches.pop(invocation_id, {})
+        for future in entries.values():
+            name = await asyncio.shield(future)
+            if not name:
+                continue
+            try:
+                await self.client.aio.caches.delete(name=name)
+            except Exception as e:
+                logger.warning("failed to delete context cache %s: %s", name, e)
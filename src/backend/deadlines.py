@@ -0,0 +1,236 @@
+"""Per-request deadlines and cancellation for agent runs.
+
+Each /agent/run gets a Deadline. Stages ask it for their budget (the time left,
+minus a reserve for assembling the response, capped per stage). ffmpeg runs are
+registered with it so cancelling the run kills them instead of letting them run
+to completion in a worker thread. The API layer cancels the run when the client
+disconnects, and the ADK stage stops at its budget so the reviews finished so
+far can still be returned. Plugin state kept per ADK invocation (context
+caches, timers) is released when the run ends however it ends, since ADK only
+calls after_run_callback for runs that complete.
+
+Configuration (environment):
+- RUN_DEADLINE_SEC: budget for a whole run (default 280). The Next.js proxy
+  sends its own timeout in X-Request-Timeout (seconds); the smaller one wins.
+- RUN_DEADLINE_RESERVE_SEC: time kept back to build and send a partial result
+  (default 3).
+- STAGE_DEADLINES_SEC: per-stage caps, e.g. "download=60,transcode=120,agent=240"
+  (default "download=60").
+- DISCONNECT_POLL_SEC: how often to check whether the client is still connected
+  (default 0.5).
+"""
+
+import asyncio
+import logging
+import os
+import subprocess
+import threading
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Mapping, Optional, Set
+
+# ADK
+from google.adk.plugins.base_plugin import BasePlugin
+
+from multi_tool_agent.rate_limit import parse_weights
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT_HEADER = "X-Request-Timeout"
+
+
+class DeadlineExceeded(Exception):
+    """A stage ran out of budget, or the run was cancelled while it was running."""
+
+
+class Deadline:
+    """Absolute expiry for one run, with per-stage caps and cancellation."""
+
+    def __init__(
+        self,
+        budget_sec: float,
+        stage_caps: Optional[Mapping[str, float]] = None,
+        reserve_sec: float = 0.0,
+    ):
+        self.expires_at = time.monotonic() + max(0.0, budget_sec)
+        self.stage_caps = dict(stage_caps or {})
+        self.reserve_sec = max(0.0, reserve_sec)
+        # Why the run was abandoned ("client disconnected" / "deadline exceeded").
+        self.cancel_reason: Optional[str] = None
+        self._processes: Set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def budget(self, stage: str) -> float:
+        """Seconds `stage` may still use: time left minus the reserve, capped."""
+        left = max(0.0, self.remaining() - self.reserve_sec)
+        return min(left, self.stage_caps.get(stage, left))
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_reason is not None
+
+    def cancel(self, reason: str) -> None:
+        """Marks the run abandoned and kills its subprocesses. Thread-safe."""
+        with self._lock:
+            if self.cancel_reason is None:
+                self.cancel_reason = reason
+            processes = list(self._processes)
+        for proc in processes:
+            _kill_quietly(proc)
+
+    def _track(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.add(proc)
+            cancelled = self.cancelled
+        if cancelled:
+            _kill_quietly(proc)
+
+    def _untrack(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(proc)
+
+
+# Set per request by the API layer; copied into worker threads by asyncio.to_thread.
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "vega_current_deadline", default=None
+)
+
+
+# Invocation ids started by the current run, nested AgentTool runs included.
+# Set per run by the API layer and filled in by InvocationTracker.
+run_invocations: ContextVar[Optional[Set[str]]] = ContextVar(
+    "vega_run_invocations", default=None
+)
+
+
+def _float_env(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)) or str(default))
+
+
+def deadline_from_headers(headers: Mapping[str, str]) -> Deadline:
+    budget = _float_env("RUN_DEADLINE_SEC", 280.0)
+    try:
+        requested = float(headers.get(TIMEOUT_HEADER) or 0)
+    except ValueError:
+        requested = 0.0
+    if requested > 0:
+        budget = min(budget, requested)
+    return Deadline(
+        budget,
+        stage_caps=parse_weights(os.getenv("STAGE_DEADLINES_SEC", "download=60")),
+        reserve_sec=_float_env("RUN_DEADLINE_RESERVE_SEC", 3.0),
+    )
+
+
+def _kill_quietly(proc: subprocess.Popen) -> None:
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+def run_subprocess(
+    cmd: List[str], stage: str = "transcode", check: bool = False
+) -> subprocess.CompletedProcess:
+    """subprocess.run for the request path: bounded by, and killed with, the run.
+
+    Raises DeadlineExceeded if the stage budget runs out or the run is cancelled.
+    """
+    deadline = current_deadline.get()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if deadline is None:
+        stdout, stderr = proc.communicate()
+    else:
+        deadline._track(proc)
+        try:
+            stdout, stderr = proc.communicate(timeout=deadline.budget(stage))
+        except subprocess.TimeoutExpired:
+            _kill_quietly(proc)
+            proc.communicate()
+            raise DeadlineExceeded(f"{cmd[0]} exceeded the {stage} budget")
+        finally:
+            deadline._untrack(proc)
+        if deadline.cancelled:
+            raise DeadlineExceeded(f"{cmd[0]} killed: {deadline.cancel_reason}")
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+async def drain_until(events: AsyncIterator, sink: List, timeout: float) -> bool:
+    """Appends items from `events` to `sink` until exhausted or `timeout` passes.
+
+    Returns False on timeout; the generator (and the ADK work behind it) is
+    cancelled and `sink` holds whatever arrived in time.
+    """
+
+    async def drain() -> None:
+        async for event in events:
+            sink.append(event)
+
+    try:
+        if timeout <= 0:
+            return False
+        await asyncio.wait_for(drain(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        await events.aclose()
+
+
+async def watch_disconnect(
+    request, on_disconnect: Callable[[], None], interval: Optional[float] = None
+) -> None:
+    """Calls `on_disconnect` once the client goes away; cancel this task to stop."""
+    interval = interval or _float_env("DISCONNECT_POLL_SEC", 0.5)
+    while not await request.is_disconnected():
+        await asyncio.sleep(interval)
+    on_disconnect()
+
+
+class InvocationTracker(BasePlugin):
+    """Adds every invocation a run starts to `run_invocations`."""
+
+    def __init__(self, name: str = "invocation_tracker"):
+        super().__init__(name)
+
+    async def before_run_callback(self, *, invocation_context) -> None:
+        invocations = run_invocations.get()
+        if invocations is not None:
+            invocations.add(invocation_context.invocation_id)
+        return None
+
+
+async def release_invocations(
+    plugins: Iterable[BasePlugin], invocation_ids: Iterable[str]
+) -> None:
+    """Calls `release_invocation` on every plugin that keeps per-invocation state."""
+    invocation_ids = list(invocation_ids)
+    for plugin in plugins:
+        release = getattr(plugin, "release_invocation", None)
+        if release is None:
+            continue
+        for invocation_id in invocation_ids:
+            try:
+                await release(invocation_id)
+            except Exception as e:
+                logger.warning(
+                    "failed to release %s state for %s: %s",
+                    plugin.name,
+                    invocation_id,
+                    e,
+                )
+
+
+def merged_state(events: List) -> Dict:
+    """Session state as written by `events` (ADK state deltas, in order)."""
+    state: Dict = {}
+    for event in events:
+        delta = getattr(getattr(event, "actions", None), "state_delta", None)
+        if delta:
+            state.update(delta)
+    return state
@@ -0,0 +1,201 @@
+"""Structured, non-blocking logging for the agent backend.
+
+Records are rendered as one JSON object per line and handed to a background
+thread through a queue, so request handlers never block on stdout. Each record
+carries the current request's correlation id.
+
+Configuration (environment):
+- LOG_LEVEL: root level (default INFO).
+- LOG_FORMAT: "json" (default) or "text".
+- LOG_MAX_FIELD_CHARS: truncate long strings in log fields (default 2000).
+- EVENT_LOG_SAMPLE_RATE: fraction of runs whose ADK events are dumped at
+  DEBUG level (default 0.0 — never).
+"""
+
+import atexit
+import contextvars
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from typing import Any, Iterable, Optional
+
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "request_id", default="-"
+)
+
+# Attributes every LogRecord has; anything else was passed via `extra=`.
+_RESERVED_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__.keys()) | {
+    "message",
+    "asctime",
+    "request_id",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _max_field_chars() -> int:
+    return int(os.getenv("LOG_MAX_FIELD_CHARS", "2000") or "2000")
+
+
+def truncate(value: Any, limit: Optional[int] = None) -> Any:
+    """Shortens long strings (recursively through dicts/lists) for logging."""
+    limit = _max_field_chars() if limit is None else limit
+    if isinstance(value, str):
+        if len(value) > limit:
+            return f"{value[:limit]}...<truncated {len(value) - limit} chars>"
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, dict):
+        return {k: truncate(v, limit) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [truncate(v, limit) for v in value]
+    return value
+
+
+def truncate_middle(text: str, limit: Optional[int] = None) -> str:
+    """Shortens `text` from the middle, keeping its start and (mostly) its end.
+
+    Used for tracebacks, whose last lines name the exception that was raised.
+    """
+    limit = _max_field_chars() if limit is None else limit
+    if len(text) <= limit:
+        return text
+    head = limit // 4
+    tail = limit - head
+    return f"{text[:head]}\n...<truncated {len(text) - limit} chars>...\n{text[-tail:]}"
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(
+                record.created, tz=datetime.timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": truncate(record.getMessage()),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = truncate(value)
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = self.formatException(record.exc_info)
+        if exc_text:
+            entry["exc"] = truncate_middle(exc_text)
+        if record.stack_info:
+            entry["stack"] = truncate_middle(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback apart from the message.
+
+    The stock prepare() folds the formatted traceback into `msg` and clears
+    exc_info; here it goes to exc_text, which both formatters render separately.
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Merge args now: they may not survive the hop to the writer thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exc_formatter.formatException(
+                    record.exc_info
+                )
+            record.exc_info = None
+        return record
+
+
+def configure_logging() -> None:
+    """Routes all logging through a queue to a single stdout writer thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if (os.getenv("LOG_FORMAT") or "json").lower() == "text":
+        stream_handler.setFormatter(
+            logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+            )
+        )
+    else:
+        stream_handler.setFormatter(JsonFormatter())
+
+    # Unbounded queue: enqueue never blocks the caller. The filter runs on the
+    # producer side so the correlation id is captured from the request context.
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel((os.getenv("LOG_LEVEL") or "INFO").upper())
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def should_sample_events() -> bool:
+    rate = float(os.getenv("EVENT_LOG_SAMPLE_RATE", "0") or "0")
+    return rate > 0 and random.random() < rate
+
+
+def summarize_event(event: Any) -> dict:
+    """Compact, size-bounded view of an ADK event (inline media is never echoed)."""
+    parts = []
+    content = getattr(event, "content", None)
+    for part in getattr(content, "parts", None) or []:
+        if getattr(part, "text", None):
+            parts.append({"text": truncate(part.text)})
+        elif getattr(part, "inline_data", None) is not None:
+            blob = part.inline_data
+            parts.append(
+                {
+                    "inline_data": blob.mime_type,
+                    "bytes": len(blob.data or b""),
+                }
+            )
+        elif getattr(part, "function_call", None) is not None:
+            parts.append({"function_call": part.function_call.name})
+        elif getattr(part, "function_response", None) is not None:
+            parts.append({"function_response": part.function_response.name})
+    return {"author": getattr(event, "author", None), "parts": parts}
+
+
+def log_events(logger: logging.Logger, events: Iterable[Any]) -> None:
+    """Dumps a run's events at DEBUG level for a sampled fraction of runs."""
+    if not logger.isEnabledFor(logging.DEBUG) or not should_sample_events():
+        return
+    logger.debug("agent events", extra={"events": [summarize_event(e) for e in events]})
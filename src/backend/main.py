@@ -1,26 +1,85 @@
+import logging
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from dotenv import load_dotenv
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    UploadFile,
+    File,
+    Form,
+    Query,
+    Request,
+    Response,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from pydantic import BaseModel
-from multi_tool_agent.agent import root_agent
+from multi_tool_agent.agent import get_root_agent, interest_levels, personality_archetypes
+from multi_tool_agent.aggregation import partial_report
+from multi_tool_agent.hedging import get_hedging_policy
+from multi_tool_agent.rate_limit import Flow, current_flow, get_rate_limiter
+from multi_tool_agent.transcription import ReviewerClipPlugin, segment_marker
+from google.adk.apps import App
 from google.adk.runners import Runner, types
 from google.adk.sessions import InMemorySessionService
+from metrics import (
+    MetricsPlugin,
+    render_latest,
+    track_queue,
+    track_stage,
+    watch_hedging,
+    watch_llm_limiter,
+    watch_scheduler,
+    ADMISSION_REJECTED,
+    REQUESTS,
+    RUNS_CANCELLED,
+)
+from tracing import TracingPlugin, configure_tracing, tracer
+from context_cache import ContextCachePlugin
+from admission import (
+    AdmissionRejected,
+    admit,
+    get_run_scheduler,
+    get_transcode_scheduler,
+    resolve_flow,
+)
+from logging_setup import configure_logging, log_events, new_request_id, request_id_var
+from deadlines import (
+    Deadline,
+    DeadlineExceeded,
+    InvocationTracker,
+    current_deadline,
+    deadline_from_headers,
+    drain_until,
+    merged_state,
+    release_invocations,
+    run_invocations,
+    run_subprocess,
+    watch_disconnect,
+)
+from serialization import (
+    RunRecord,
+    append_lines,
+    json_response,
+    parse_fields,
+    select_report_fields,
+    write_payload,
+)
 
 import base64
+import re
+import functools
 import json
 import datetime
 import tempfile
-import subprocess
 import shutil
 import asyncio
 import httpx
 
-
 # Load environment variables
 load_dotenv()
 env_path = Path(__file__).with_name(".env")
@@ -29,6 +88,13 @@ if env_path.exists():
 
 # Import the existing agent and Google ADK components
 
+configure_logging()
+configure_tracing()
+logger = logging.getLogger(__name__)
+
+# Where run results and extracted JSON objects are persisted.
+DATA_DIR = Path(os.getenv("VEGA_DATA_DIR") or Path(__file__).parent / "data")
+
 
 class RunRequest(BaseModel):
     prompt: Optional[str] = Form(None)
@@ -38,6 +104,8 @@ class RunRequest(BaseModel):
 
 class RunResponse(BaseModel):
     ok: bool
+    # True when the run hit its deadline and `result` holds the reviews so far.
+    partial: bool = False
     result: Optional[Any] = None
     error: Optional[str] = None
 
@@ -53,6 +121,69 @@ def _extract_result(raw: Any) -> Any:
     return raw
 
 
+def _ffmpeg_transcode_cmd(
+    in_path: str,
+    out_path: str,
+    start_sec: Optional[float] = None,
+    duration_sec: Optional[float] = None,
+) -> list:
+    """Builds the ffmpeg command used for every transcode (whole video or segment)."""
+    # Basic ffmpeg compression settings: re-encode with libx264 and moderate CRF.
+    # Apply duration/scale/fps limits to reduce model token usage and avoid INVALID_ARGUMENT
+    target_height = int(os.getenv("VIDEO_TARGET_HEIGHT", "480") or "480")
+    target_fps = int(os.getenv("VIDEO_TARGET_FPS", "12") or "12")
+    vf = f"scale=-2:{target_height}:flags=lanczos"
+
+    cmd = ["ffmpeg", "-y"]
+    if start_sec:
+        # Input seeking: fast, and accurate since we re-encode.
+        cmd += ["-ss", f"{start_sec:.3f}"]
+    cmd += ["-i", in_path]
+    if duration_sec and duration_sec > 0:
+        cmd += ["-t", f"{duration_sec:.3f}"]
+    cmd += [
+        "-vf",
+        vf,
+        "-r",
+        str(target_fps),
+        "-vcodec",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-crf",
+        "28",
+        "-acodec",
+        "aac",
+        "-b:a",
+        "96k",
+        "-movflags",
+        "+faststart",
+        out_path,
+    ]
+    return cmd
+
+
+def _input_suffix(original_filename: Optional[str], target_ext: str) -> str:
+    # Choose input suffix from original filename if available
+    suffix = f".{target_ext}"
+    if original_filename:
+        try:
+            orig_suffix = Path(original_filename).suffix
+            if orig_suffix:
+                suffix = orig_suffix
+        except Exception:
+            pass
+    return suffix
+
+
+def _remove_quietly(path: Optional[str]) -> None:
+    try:
+        if path and os.path.exists(path):
+            os.remove(path)
+    except Exception:
+        pass
+
+
 def compress_video_bytes(
     input_bytes: bytes, original_filename: Optional[str] = None, target_ext: str = "mp4"
 ) -> bytes:
@@ -63,23 +194,15 @@ def compress_video_bytes(
     - Writes temporary files to disk for ffmpeg to operate on.
     """
     if not shutil.which("ffmpeg"):
-        print("WARNING: ffmpeg not found on PATH; skipping compression")
+        logger.warning("ffmpeg not found on PATH; skipping compression")
         return input_bytes
 
     in_path = None
     out_path = None
     try:
-        # Choose input suffix from original filename if available
-        suffix = f".{target_ext}"
-        if original_filename:
-            try:
-                orig_suffix = Path(original_filename).suffix
-                if orig_suffix:
-                    suffix = orig_suffix
-            except Exception:
-                pass
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as in_f:
+        with tempfile.NamedTemporaryFile(
+            delete=False, suffix=_input_suffix(original_filename, target_ext)
+        ) as in_f:
             in_f.write(input_bytes)
             in_path = in_f.name
 
@@ -90,43 +213,11 @@ def compress_video_bytes(
         except Exception:
             pass
 
-        # Basic ffmpeg compression settings: re-encode with libx264 and moderate CRF.
-        # Apply duration/scale/fps limits to reduce model token usage and avoid INVALID_ARGUMENT
         max_duration_sec = int(os.getenv("MAX_VIDEO_DURATION_SEC", "60") or "60")
-        target_height = int(os.getenv("VIDEO_TARGET_HEIGHT", "480") or "480")
-        target_fps = int(os.getenv("VIDEO_TARGET_FPS", "12") or "12")
-        vf = f"scale=-2:{target_height}:flags=lanczos"
-
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-i",
-            in_path,
-        ]
-        if max_duration_sec > 0:
-            cmd += ["-t", str(max_duration_sec)]
-        cmd += [
-            "-vf",
-            vf,
-            "-r",
-            str(target_fps),
-            "-vcodec",
-            "libx264",
-            "-preset",
-            "veryfast",
-            "-crf",
-            "28",
-            "-acodec",
-            "aac",
-            "-b:a",
-            "96k",
-            "-movflags",
-            "+faststart",
-            out_path,
-        ]
+        cmd = _ffmpeg_transcode_cmd(in_path, out_path, duration_sec=max_duration_sec)
 
         # Run ffmpeg (capture output to avoid noisy logs)
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        run_subprocess(cmd, check=True)
 
         with open(out_path, "rb") as f:
             out_bytes = f.read()
@@ -135,20 +226,138 @@ def compress_video_bytes(
         if len(out_bytes) < len(input_bytes) or len(out_bytes) > 0:
             return out_bytes
         return input_bytes
+    except DeadlineExceeded:
+        # Out of time or abandoned: sending the raw upload would only cost more.
+        raise
     except Exception as e:
-        print(f"WARNING: video compression failed: {e}")
+        logger.warning("video compression failed: %s", e)
         return input_bytes
     finally:
-        try:
-            if in_path and os.path.exists(in_path):
-                os.remove(in_path)
-        except Exception:
-            pass
-        try:
-            if out_path and os.path.exists(out_path):
-                os.remove(out_path)
-        except Exception:
-            pass
+        _remove_quietly(in_path)
+        _remove_quietly(out_path)
+
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def _probe_duration_sec(path: str) -> Optional[float]:
+    """Reads the container duration from `ffmpeg -i` (no ffprobe dependency)."""
+    proc = run_subprocess(["ffmpeg", "-hide_banner", "-i", path])
+    match = _DURATION_RE.search(proc.stderr.decode("utf-8", errors="replace"))
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def segment_windows(
+    duration_sec: float, window_sec: float, overlap_sec: float
+) -> List[Tuple[float, float]]:
+    """Splits [0, duration) into windows of `window_sec` that overlap by `overlap_sec`.
+
+    A tail that would add less than `overlap_sec` of new footage is merged into
+    the previous window instead of becoming a window of almost pure overlap.
+    """
+    if window_sec <= 0 or duration_sec <= window_sec:
+        return [(0.0, duration_sec)]
+    overlap_sec = max(0.0, overlap_sec)
+    step = max(1.0, window_sec - overlap_sec)
+    windows = []
+    start = 0.0
+    while True:
+        end = min(duration_sec, start + window_sec)
+        if duration_sec - end < overlap_sec:
+            end = duration_sec
+        windows.append((start, end))
+        if end >= duration_sec:
+            return windows
+        start += step
+
+
+def _write_temp(data: bytes, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
+        f.write(data)
+        return f.name
+
+
+def _transcode_window(in_path: str, start: float, end: float, target_ext: str) -> bytes:
+    fd, out_path = tempfile.mkstemp(suffix=f".{target_ext}")
+    os.close(fd)
+    try:
+        cmd = _ffmpeg_transcode_cmd(
+            in_path, out_path, start_sec=start, duration_sec=end - start
+        )
+        run_subprocess(cmd, check=True)
+        with open(out_path, "rb") as f:
+            return f.read()
+    finally:
+        _remove_quietly(out_path)
+
+
+async def segment_video_bytes(
+    input_bytes: bytes, original_filename: Optional[str] = None, target_ext: str = "mp4"
+) -> Optional[List[Tuple[float, float, bytes]]]:
+    """
+    Split a long video into overlapping, individually compressed segments.
+
+    Returns [(start_sec, end_sec, bytes), ...] when the video is longer than
+    MAX_VIDEO_DURATION_SEC, or None when it fits in one window (or ffmpeg is
+    unavailable / fails), in which case callers fall back to compress_video_bytes.
+    DeadlineExceeded is raised rather than falling back when the run is out of
+    time or abandoned.
+    Each segment takes one slot of the shared transcode scheduler, so segments of
+    different requests interleave fairly (see admission.py).
+
+    - VIDEO_SEGMENTATION: "0" disables segmentation.
+    - VIDEO_SEGMENT_OVERLAP_SEC: overlap between consecutive windows (default 5).
+    - MAX_TOTAL_VIDEO_DURATION_SEC: hard cap on the total length analysed (default 600).
+    """
+    if os.getenv("VIDEO_SEGMENTATION", "1") == "0" or not shutil.which("ffmpeg"):
+        return None
+    window_sec = int(os.getenv("MAX_VIDEO_DURATION_SEC", "60") or "60")
+    if window_sec <= 0:
+        return None
+    overlap_sec = float(os.getenv("VIDEO_SEGMENT_OVERLAP_SEC", "5") or "5")
+    max_total_sec = int(os.getenv("MAX_TOTAL_VIDEO_DURATION_SEC", "600") or "600")
+
+    in_path = None
+    try:
+        in_path = await asyncio.to_thread(
+            _write_temp, input_bytes, _input_suffix(original_filename, target_ext)
+        )
+        duration = await asyncio.to_thread(_probe_duration_sec, in_path)
+        if duration is None or duration <= window_sec:
+            return None
+        if max_total_sec > 0:
+            duration = min(duration, float(max_total_sec))
+        windows = segment_windows(duration, window_sec, overlap_sec)
+
+        async def transcode(start: float, end: float) -> bytes:
+            async with get_transcode_scheduler().slot():
+                return await asyncio.to_thread(
+                    _transcode_window, in_path, start, end, target_ext
+                )
+
+        # return_exceptions: let every ffmpeg finish before the input is removed.
+        results = await asyncio.gather(
+            *(transcode(start, end) for start, end in windows),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        logger.info(
+            "segmented video",
+            extra={"duration_sec": duration, "segments": len(windows)},
+        )
+        return [(start, end, data) for (start, end), data in zip(windows, results)]
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.warning("video segmentation failed: %s", e)
+        return None
+    finally:
+        _remove_quietly(in_path)
 
 
 def _extract_json_objects_from_text(text: str) -> list:
@@ -298,6 +507,36 @@ def _normalize_result_structure(value: Any) -> Any:
 
 app = FastAPI(title="Agent Backend", version="0.1.0")
 
+# Scheduler gauges are sampled at scrape time; the schedulers hold no graph state.
+watch_llm_limiter(get_rate_limiter())
+watch_scheduler("runs", get_run_scheduler())
+watch_scheduler("transcode", get_transcode_scheduler())
+watch_scheduler("llm", get_rate_limiter().scheduler)
+watch_hedging(get_hedging_policy())
+
+
+@functools.lru_cache(maxsize=1)
+def get_agent_app() -> App:
+    """One ADK app shared by every run; plugins observe all agents in the pipeline.
+
+    Built on first use so worker start-up does not pay for the agent graph.
+    """
+    return App(
+        name="vega-agent",
+        root_agent=get_root_agent(),
+        # Plugins run in order. Reviewers' extra segments are dropped before the
+        # shared prefix is cached, and context caching rewrites reviewer
+        # requests before the observers record model/payload attributes.
+        plugins=[
+            InvocationTracker(),
+            ReviewerClipPlugin(),
+            ContextCachePlugin(),
+            MetricsPlugin(),
+            TracingPlugin(),
+        ],
+    )
+
+
 # CORS configuration
 frontend_origin = os.getenv("FRONTEND_ORIGIN", "http://localhost:3000")
 allow_origins = [
@@ -317,31 +556,211 @@ app.add_middleware(
 )
 
 
+# Plain ASGI middlewares rather than @app.middleware("http"): BaseHTTPMiddleware
+# hides the client's http.disconnect from the endpoint, so runs would never see
+# the client go away.
+class RequestCountMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Use the route template (not the raw path) to keep label cardinality bounded.
+            route = scope.get("route")
+            REQUESTS.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status),
+            ).inc()
+
+
+class RequestIdMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Honour an upstream id (e.g. from the Next.js proxy) so logs line up end to end.
+        request_id = Headers(scope=scope).get("X-Request-ID") or new_request_id()
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+app.add_middleware(RequestCountMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
+
 @app.get("/health")
 def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics() -> Response:
+    payload, content_type = render_latest()
+    return Response(content=payload, media_type=content_type)
+
+
 @app.post("/agent/run", response_model=RunResponse)
+@tracer.start_as_current_span("agent.run")
 async def run_agent(
+    request: Request,
     prompt: Optional[str] = Form(None),
     video: Optional[UploadFile] = File(None),
     video_uri: Optional[str] = Form(None),
-) -> RunResponse:
-    print(
-        f"[run_agent] Received prompt={bool(prompt)} video_present={bool(video)} video_uri_present={bool(video_uri)}"
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated dotted paths into the report to return, "
+        'e.g. "metrics,personas.name" (applied inside `result.output` for a '
+        "full run, to `result` for a partial one); omit for the full result.",
+    ),
+) -> Response:
+    flow = resolve_flow(request.headers)
+    logger.info(
+        "run_agent received request",
+        extra={
+            "prompt_present": bool(prompt),
+            "video_present": bool(video),
+            "video_uri_present": bool(video_uri),
+            "tenant": flow.tenant,
+            "lane": flow.lane,
+        },
     )
     if not prompt and not video and not video_uri:
         raise HTTPException(
             status_code=400, detail="Either prompt, video, or video_uri is required"
         )
 
+    # Every scheduler the run passes through (runs, transcode, LLM) reads the
+    # flow from this context variable; ffmpeg runs register with the deadline.
+    deadline = deadline_from_headers(request.headers)
+    token = current_flow.set(flow)
+    deadline_token = current_deadline.set(deadline)
+    task = asyncio.create_task(
+        _admit_and_run(flow, deadline, prompt, video, video_uri)
+    )
+
+    def abandon(reason: str) -> None:
+        # Kill ffmpeg first: worker threads do not see the task's cancellation.
+        deadline.cancel(reason)
+        task.cancel()
+
+    watcher = asyncio.create_task(
+        watch_disconnect(request, lambda: abandon("client disconnected"))
+    )
     try:
-        session_service = InMemorySessionService()
-        runner = Runner(
-            app_name="vega-agent", agent=root_agent, session_service=session_service
+        # The pipeline stops its agent stage early enough to return a partial
+        # result; this is the hard stop for anything that does not.
+        done, _ = await asyncio.wait({task}, timeout=deadline.remaining())
+        if not done:
+            abandon("deadline exceeded")
+            await asyncio.wait({task})
+        if task.cancelled():
+            disconnected = deadline.cancel_reason == "client disconnected"
+            RUNS_CANCELLED.labels(
+                reason="disconnect" if disconnected else "deadline"
+            ).inc()
+            logger.warning("run abandoned: %s", deadline.cancel_reason)
+            return json_response(
+                request,
+                RunResponse(ok=False, error=deadline.cancel_reason),
+                # 499: client closed request (nginx convention).
+                status_code=499 if disconnected else 504,
+            )
+        response = task.result()
+    except DeadlineExceeded as e:
+        # A stage ran out of its own budget (e.g. STAGE_DEADLINES_SEC transcode).
+        RUNS_CANCELLED.labels(reason="deadline").inc()
+        logger.warning("run abandoned: %s", e)
+        return json_response(
+            request, RunResponse(ok=False, error=str(e)), status_code=504
         )
-        user_id = "test_user"
+    except AdmissionRejected as e:
+        ADMISSION_REJECTED.labels(lane=flow.lane).inc()
+        logger.warning("run rejected: %s", e)
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    finally:
+        watcher.cancel()
+        if not task.done():
+            abandon("request cancelled")
+        current_deadline.reset(deadline_token)
+        current_flow.reset(token)
+
+    selected = parse_fields(fields)
+    if selected and response.result is not None:
+        response.result = select_report_fields(response.result, selected)
+    with tracer.start_as_current_span("encode_response") as span:
+        encoded = json_response(request, response)
+        span.set_attribute("vega.payload_bytes", len(encoded.body))
+    return encoded
+
+
+# Strong references to cleanup tasks still running after their request ended.
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _release_in_background(invocation_ids: Set[str]) -> None:
+    if not invocation_ids:
+        return
+    task = asyncio.create_task(
+        release_invocations(get_agent_app().plugins, invocation_ids)
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _admit_and_run(
+    flow: Flow,
+    deadline: Deadline,
+    prompt: Optional[str],
+    video: Optional[UploadFile],
+    video_uri: Optional[str],
+) -> RunResponse:
+    async with admit(flow):
+        return await _run_pipeline(flow, deadline, prompt, video, video_uri)
+
+
+async def _run_pipeline(
+    flow: Flow,
+    deadline: Deadline,
+    prompt: Optional[str],
+    video: Optional[UploadFile],
+    video_uri: Optional[str],
+) -> RunResponse:
+    invocations: Set[str] = set()
+    invocations_token = run_invocations.set(invocations)
+    try:
+        session_service = InMemorySessionService()
+        runner = Runner(app=get_agent_app(), session_service=session_service)
+        user_id = flow.tenant
         session_id = "test_session"
         # Create session if not exists
         session_service.create_session_sync(
@@ -361,19 +780,28 @@ async def run_agent(
         if video_uri:
             try:
                 async with httpx.AsyncClient(
-                    follow_redirects=True, timeout=60.0
+                    follow_redirects=True, timeout=deadline.budget("download")
                 ) as client:
-                    resp = await client.get(video_uri)
+                    with tracer.start_as_current_span("fetch") as span, track_stage(
+                        "download"
+                    ):
+                        resp = await client.get(video_uri)
+                        span.set_attribute("http.status_code", resp.status_code)
+                        span.set_attribute("vega.payload_bytes", len(resp.content))
                     resp.raise_for_status()
                     video_bytes = resp.content
                     ct = resp.headers.get("Content-Type")
                     if ct:
                         mime_type = ct
-                    print(
-                        f"[run_agent] Fetched video from URI; bytes={len(video_bytes) if video_bytes else 0} mime={mime_type}"
+                    logger.info(
+                        "fetched video from URI",
+                        extra={
+                            "bytes": len(video_bytes) if video_bytes else 0,
+                            "mime": mime_type,
+                        },
                     )
             except Exception as e:
-                print(f"WARNING: failed to fetch video from URI: {e}")
+                logger.warning("failed to fetch video from URI: %s", e)
                 video_bytes = None
 
             if not mime_type:
@@ -389,32 +817,114 @@ async def run_agent(
                 mime_type = "video/mp4"
             else:
                 mime_type = video.content_type or "video/mp4"
-            print(
-                f"[run_agent] Received video file upload; bytes={len(video_bytes) if video_bytes else 0} mime={mime_type}"
+            logger.info(
+                "received video file upload",
+                extra={
+                    "bytes": len(video_bytes) if video_bytes else 0,
+                    "mime": mime_type,
+                },
             )
 
         if video_bytes:
-            # Try to compress the video bytes in a thread to avoid blocking the event loop
-            try:
-                compressed_bytes = await asyncio.to_thread(
-                    compress_video_bytes, video_bytes, original_filename, "mp4"
-                )
-            except Exception as e:
-                print(f"WARNING: compression thread failed: {e}")
-                compressed_bytes = video_bytes
+            # Long videos are split into overlapping windows that are transcribed
+            # in parallel; each segment is preceded by a marker part that the
+            # SegmentedTranscriber routes on.
+            segments = None
+            with tracer.start_as_current_span("segment") as span, track_queue(
+                "compress"
+            ), track_stage("segment_video_bytes"):
+                span.set_attribute("vega.input_bytes", len(video_bytes))
+                try:
+                    segments = await segment_video_bytes(
+                        video_bytes, original_filename, "mp4"
+                    )
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    logger.warning("segmentation thread failed: %s", e)
+                span.set_attribute("vega.segments", len(segments) if segments else 0)
+
+            if segments:
+                with tracer.start_as_current_span("base64_encode") as span:
+                    payload_chars = 0
+                    for index, (start, end, data) in enumerate(segments, start=1):
+                        base64_data = base64.b64encode(data).decode("utf-8")
+                        payload_chars += len(base64_data)
+                        parts.append(
+                            types.Part(
+                                text=segment_marker(index, len(segments), start, end)
+                            )
+                        )
+                        parts.append(
+                            types.Part(
+                                inline_data=types.Blob(
+                                    mime_type="video/mp4", data=base64_data
+                                )
+                            )
+                        )
+                    span.set_attribute("vega.payload_bytes", payload_chars)
+            else:
+                # Try to compress the video bytes in a thread to avoid blocking the event loop
+                try:
+                    with tracer.start_as_current_span("transcode") as span, track_queue(
+                        "compress"
+                    ), track_stage("compress_video_bytes"):
+                        span.set_attribute("vega.input_bytes", len(video_bytes))
+                        async with get_transcode_scheduler().slot():
+                            compressed_bytes = await asyncio.to_thread(
+                                compress_video_bytes,
+                                video_bytes,
+                                original_filename,
+                                "mp4",
+                            )
+                        span.set_attribute("vega.output_bytes", len(compressed_bytes))
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    logger.warning("compression thread failed: %s", e)
+                    compressed_bytes = video_bytes
 
-            base64_data = base64.b64encode(compressed_bytes).decode("utf-8")
-            file_data = types.Blob(mime_type=mime_type or "video/mp4", data=base64_data)
-            parts.append(types.Part(inline_data=file_data))
+                with tracer.start_as_current_span("base64_encode") as span:
+                    base64_data = base64.b64encode(compressed_bytes).decode("utf-8")
+                    span.set_attribute("vega.payload_bytes", len(base64_data))
+                file_data = types.Blob(
+                    mime_type=mime_type or "video/mp4", data=base64_data
+                )
+                parts.append(types.Part(inline_data=file_data))
 
         if not parts:
             parts.append(types.Part(text="Process this video for YouTube Shorts."))
 
         new_message = types.Content(parts=parts, role="user")
-        events = list(
-            runner.run(user_id=user_id, session_id=session_id, new_message=new_message)
-        )
-        print("Events:", [str(e) for e in events])  # Debug print
+        events = []
+        # run_async keeps the ADK agent/LLM spans parented under this request's span.
+        with tracer.start_as_current_span("adk.run") as span, track_queue(
+            "agent_run"
+        ):
+            completed = await drain_until(
+                runner.run_async(
+                    user_id=user_id, session_id=session_id, new_message=new_message
+                ),
+                events,
+                deadline.budget("agent"),
+            )
+            span.set_attribute("vega.partial", not completed)
+        log_events(logger, events)
+        if not completed:
+            # Out of budget: the pending reviewer/merger calls were cancelled;
+            # return what the finished reviewers produced.
+            RUNS_CANCELLED.labels(reason="deadline").inc()
+            logger.warning(
+                "agent run hit its deadline; returning partial result",
+                extra={"events": len(events)},
+            )
+            return RunResponse(
+                ok=True,
+                partial=True,
+                result=partial_report(
+                    merged_state(events), personality_archetypes, interest_levels
+                ),
+            )
         # Extract result from events
         result = None
         for event in reversed(events):
@@ -435,38 +945,26 @@ async def run_agent(
                 for p in e.content.parts
                 if getattr(p, "text", None)
             )
-            found = _extract_json_objects_from_text(all_text)
+            with tracer.start_as_current_span("json_extraction") as span:
+                found = _extract_json_objects_from_text(all_text)
+                span.set_attribute("vega.text_chars", len(all_text))
+                span.set_attribute("vega.objects_found", len(found))
             if found:
                 found_json_objects = found
-                # Ensure data dir exists
-                json_file = Path(__file__).parent / "data" / "json_objects.json"
-                json_file.parent.mkdir(parents=True, exist_ok=True)
-                # Load existing list if present
-                try:
-                    if json_file.exists():
-                        with open(json_file, "r", encoding="utf-8") as jf:
-                            existing = json.load(jf)
-                            if isinstance(existing, list):
-                                jsonObjectList.extend(existing)
-                except Exception as e:
-                    print(f"WARNING: failed to load existing json objects: {e}")
-
-                # Append and deduplicate simple by string representation
-                for obj in found:
-                    try:
-                        jsonObjectList.append(obj)
-                    except Exception:
-                        pass
-
-                # Persist the list
+                # Append-only log: cost per run is independent of its history.
                 try:
-                    with open(json_file, "w", encoding="utf-8") as jf:
-                        json.dump(jsonObjectList, jf, ensure_ascii=False, indent=2)
-                    print(f"Appended {len(found)} json object(s) to {json_file}")
+                    with tracer.start_as_current_span("persist") as span:
+                        span.set_attribute("vega.target", "json_objects")
+                        json_file = await asyncio.to_thread(
+                            append_lines, DATA_DIR / "json_objects.jsonl", found
+                        )
+                    logger.info(
+                        "appended %d json object(s) to %s", len(found), json_file
+                    )
                 except Exception as e:
-                    print(f"WARNING: failed to persist json object list: {e}")
+                    logger.warning("failed to persist json object list: %s", e)
         except Exception as e:
-            print(f"WARNING: json extraction failed: {e}")
+            logger.warning("json extraction failed: %s", e)
 
         # Ensure JSON-serializable (normalize potential JSON strings first)
         normalized_result = _normalize_result_structure(result)
@@ -486,36 +984,37 @@ async def run_agent(
                 normalized_result = found_json_objects[-1]
             except Exception:
                 pass
-        safe_result = jsonable_encoder(normalized_result, custom_encoder={set: list})
+        # Agent output is parsed JSON (or a plain string); serialization.dumps
+        # handles anything else (sets, models) when it is encoded.
+        safe_result = normalized_result
 
         # Persist the result to a JSON file under src/backend/data
         try:
-            data_dir = Path(__file__).parent / "data"
-            data_dir.mkdir(parents=True, exist_ok=True)
             timestamp = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            filename = f"{timestamp}_{session_id}.json"
-            filepath = data_dir / filename
-            payload = {
-                "meta": {
-                    "app_name": "vega-agent",
-                    "user_id": user_id,
-                    "session_id": session_id,
-                    "created_at": datetime.datetime.utcnow().isoformat() + "Z",
-                },
-                "result": safe_result,
-            }
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(payload, f, ensure_ascii=False, indent=2)
-            print(f"Saved run result to {filepath}")
+            filepath = DATA_DIR / f"{timestamp}_{session_id}.json"
+            record = RunRecord.create(user_id, session_id, safe_result)
+            with tracer.start_as_current_span("persist") as span:
+                span.set_attribute("vega.target", "run_result")
+                filepath = await asyncio.to_thread(write_payload, filepath, record)
+            logger.info("saved run result to %s", filepath)
         except Exception as e:
-            print(f"WARNING: failed to write run result to file: {e}")
+            logger.warning("failed to write run result to file: %s", e)
 
         return RunResponse(
             ok=True,
             result=safe_result,
         )
+    except DeadlineExceeded:
+        raise
     except Exception as e:
+        logger.exception("agent run failed")
         return RunResponse(ok=False, error=str(e))
+    finally:
+        # ADK calls after_run_callback only for runs that complete; runs cut
+        # short by the deadline, a disconnect or an error are cleaned up here.
+        # Cache deletion runs in the background so it does not delay the reply.
+        _release_in_background(invocations)
+        run_invocations.reset(invocations_token)
 
 
 if __name__ == "__main__":
@@ -523,6 +1022,3 @@ if __name__ == "__main__":
 
     uvicorn.run("main:app", host="localhost", port=2000, reload=True)
 
-
-jsonObjectList = []
-inputJsonObject = {}
@@ -0,0 +1,270 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# ADK
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+
+# Video runs take tens of seconds to minutes; keep resolution at the long end.
+DURATION_BUCKETS = (
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    20.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+    600.0,
+)
+
+REQUESTS = Counter(
+    "vega_http_requests_total",
+    "HTTP requests handled by the backend.",
+    ["method", "route", "status"],
+)
+QUEUE_DEPTH = Gauge(
+    "vega_queue_depth",
+    "Work items currently queued or running, per queue.",
+    ["queue"],
+)
+STAGE_SECONDS = Histogram(
+    "vega_stage_duration_seconds",
+    "Duration of non-agent pipeline stages (download, compress_video_bytes, ...).",
+    ["stage"],
+    buckets=DURATION_BUCKETS,
+)
+AGENT_SECONDS = Histogram(
+    "vega_agent_duration_seconds",
+    "Wall time of each ADK agent (transcriber, reviewers, review waves, merger).",
+    ["agent"],
+    buckets=DURATION_BUCKETS,
+)
+LLM_SECONDS = Histogram(
+    "vega_llm_call_duration_seconds",
+    "Latency of individual model calls.",
+    ["agent", "model"],
+    buckets=DURATION_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "vega_llm_tokens_total",
+    "Tokens reported by the model, split by direction (input/output/cached).",
+    ["agent", "model", "direction"],
+)
+LLM_RATE_LIMITED = Counter(
+    "vega_llm_rate_limited_total",
+    "Model calls rejected with HTTP 429 / RESOURCE_EXHAUSTED.",
+    ["agent", "model"],
+)
+LLM_ERRORS = Counter(
+    "vega_llm_errors_total",
+    "Model calls that raised, by error code.",
+    ["agent", "model", "code"],
+)
+ADMISSION_WAITING = Gauge(
+    "vega_admission_waiting",
+    "Work items waiting for a fair-share scheduler slot, per scheduler and lane.",
+    ["scheduler", "lane"],
+)
+ADMISSION_ACTIVE = Gauge(
+    "vega_admission_active",
+    "Fair-share scheduler slots in use, per scheduler and lane.",
+    ["scheduler", "lane"],
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "vega_admission_wait_seconds",
+    "Time spent queued for a fair-share scheduler slot.",
+    ["scheduler", "lane"],
+    buckets=DURATION_BUCKETS,
+)
+ADMISSION_REJECTED = Counter(
+    "vega_admission_rejected_total",
+    "Agent runs refused by admission control (tenant quota or queue limit).",
+    ["lane"],
+)
+LLM_HEDGES = Counter(
+    "vega_llm_hedges_total",
+    "Hedged model calls by outcome (issued: duplicate sent; won/lost: which "
+    "attempt answered first was the duplicate or not; no_budget: skipped).",
+    ["model", "outcome"],
+)
+RUNS_CANCELLED = Counter(
+    "vega_runs_cancelled_total",
+    "Agent runs stopped early, by reason (disconnect: client went away; "
+    "deadline: out of budget, partial or no result returned).",
+    ["reason"],
+)
+CONTEXT_CACHE_REQUESTS = Counter(
+    "vega_context_cache_requests_total",
+    "Reviewer model calls by shared-context cache outcome (hit/skipped/failed).",
+    ["agent", "outcome"],
+)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Returns the Prometheus exposition payload and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Times a block of work into the stage duration histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def track_queue(queue: str):
+    """Counts a work item against a queue-depth gauge while the block runs."""
+    gauge = QUEUE_DEPTH.labels(queue=queue)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def watch_llm_limiter(limiter) -> None:
+    """Exposes the shared model-call limiter as `llm` (waiting) and
+    `llm_active` (in flight) queue-depth series, sampled at scrape time."""
+    QUEUE_DEPTH.labels(queue="llm").set_function(lambda: limiter.waiting)
+    QUEUE_DEPTH.labels(queue="llm_active").set_function(lambda: limiter.active)
+
+
+def watch_scheduler(name: str, scheduler) -> None:
+    """Exports a FairScheduler's per-lane waiting/active counts and wait times.
+
+    Tenants are deliberately not a label, to keep series cardinality bounded.
+    """
+    for lane in ("interactive", "batch"):
+        ADMISSION_WAITING.labels(scheduler=name, lane=lane).set_function(
+            lambda lane=lane: scheduler.waiting_by_lane[lane]
+        )
+        ADMISSION_ACTIVE.labels(scheduler=name, lane=lane).set_function(
+            lambda lane=lane: scheduler.active_by_lane[lane]
+        )
+    scheduler.on_wait = lambda flow, seconds: ADMISSION_WAIT_SECONDS.labels(
+        scheduler=name, lane=flow.lane
+    ).observe(seconds)
+
+
+def watch_hedging(policy) -> None:
+    """Counts a HedgingPolicy's duplicate calls and their outcomes."""
+    policy.on_hedge = lambda model, outcome: LLM_HEDGES.labels(
+        model=model, outcome=outcome
+    ).inc()
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code == 429:
+        return True
+    return "RESOURCE_EXHAUSTED" in str(error)
+
+
+class MetricsPlugin(BasePlugin):
+    """Records agent/model timings, token usage and 429s for every runner invocation."""
+
+    def __init__(self, name: str = "metrics"):
+        super().__init__(name)
+        # Keyed by (invocation_id, agent_name); values are perf_counter starts.
+        self._agent_starts: Dict[Tuple[str, str], float] = {}
+        self._model_starts: Dict[Tuple[str, str], Tuple[float, str]] = {}
+
+    async def before_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ):
+        key = (callback_context.invocation_id, agent.name)
+        self._agent_starts[key] = time.perf_counter()
+        return None
+
+    async def after_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ):
+        key = (callback_context.invocation_id, agent.name)
+        start = self._agent_starts.pop(key, None)
+        if start is not None:
+            AGENT_SECONDS.labels(agent=agent.name).observe(time.perf_counter() - start)
+        return None
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ):
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        self._model_starts[key] = (time.perf_counter(), llm_request.model or "unknown")
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ):
+        agent_name = callback_context.agent_name
+        key = (callback_context.invocation_id, agent_name)
+        # Streamed partial chunks repeat the usage so far; the call is recorded
+        # once, on its final response. A response with no pending start (a
+        # duplicate for a call already recorded) is ignored.
+        if llm_response.partial:
+            return None
+        started = self._model_starts.pop(key, None)
+        if started is None:
+            return None
+        start, model = started
+        LLM_SECONDS.labels(agent=agent_name, model=model).observe(
+            time.perf_counter() - start
+        )
+
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            for direction, count in (
+                ("input", usage.prompt_token_count),
+                ("output", usage.candidates_token_count),
+                ("cached", usage.cached_content_token_count),
+            ):
+                if count:
+                    LLM_TOKENS.labels(
+                        agent=agent_name, model=model, direction=direction
+                    ).inc(count)
+        return None
+
+    async def on_model_error_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_request: LlmRequest,
+        error: Exception,
+    ):
+        agent_name = callback_context.agent_name
+        self._model_starts.pop((callback_context.invocation_id, agent_name), None)
+        model = llm_request.model or "unknown"
+        if is_rate_limit_error(error):
+            LLM_RATE_LIMITED.labels(agent=agent_name, model=model).inc()
+        code = str(getattr(error, "code", None) or type(error).__name__)
+        LLM_ERRORS.labels(agent=agent_name, model=model, code=code).inc()
+        return None
+
+    async def release_invocation(self, invocation_id: str) -> None:
+        # Drop timers left behind by agents that raised or were cancelled.
+        for starts in (self._agent_starts, self._model_starts):
+            for key in [k for k in starts if k[0] == invocation_id]:
+                starts.pop(key, None)
+
+    async def after_run_callback(self, *, invocation_context) -> None:
+        await self.release_invocation(invocation_context.invocation_id)
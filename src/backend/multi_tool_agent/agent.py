@@ -1,3 +1,4 @@
+import functools
 import os
 
 # Load environment variables
@@ -8,13 +9,17 @@ try:
 except Exception:
     pass
 
-from typing import List
-from pydantic import BaseModel, Field
+from typing import List, Type
+from pydantic import BaseModel, Field, create_model
 
 # ADK
 from google.adk.agents import LlmAgent, ParallelAgent, SequentialAgent
 from google.adk.tools.agent_tool import AgentTool
 
+from .aggregation import VerdictAggregator
+from .models import gemini_model
+from .rate_limit import weights_from_env
+from .transcription import SegmentedTranscriber
 from .util import load_instruction_from_file
 
 
@@ -28,29 +33,6 @@ class PersonaMiniSchema(BaseModel):
     liked: bool
 
 
-# --- Sub Agent 2: Summarizer ---
-summarizer_agent = LlmAgent(
-    name="VideoSummarizer",
-    model="gemini-2.5-flash-lite",
-    instruction=load_instruction_from_file("./instructions/transcript_summarizer.txt"),
-    description="Creates concise summaries from video transcripts to reduce token usage",
-    output_key="video_summary",
-)
-summarize_tool = AgentTool(agent=summarizer_agent)
-
-# --- Sub Agent 1: Transcriber ---
-transcriber_agent = LlmAgent(
-    name="VideoTranscriber",
-    model="gemini-2.0-flash-lite",
-    instruction=load_instruction_from_file("./instructions/video_transcriber.txt"),
-    description="Transcribes audio from video files into clean, formatted text",
-    tools=[summarize_tool],
-    output_key="video_transcript",
-)
-
-# --- Create research agents with different personalities ---
-research_agents: List[LlmAgent] = []
-
 archetype_to_category = {
     "shopping": "Shopping",
     "music": "Music",
@@ -76,13 +58,9 @@ personality_archetypes = [
 ]
 interest_levels = ["beginner", "intermediate", "expert"]
 
-for archetype in personality_archetypes:
-    category = archetype_to_category[archetype]
-    for level in interest_levels:
-        base = load_instruction_from_file("./instructions/enjoyer_instruction.txt")
-        instruction_text = (
-            base.replace("{level}", level).replace("{category}", category)
-            + """
+WAVE_SIZE = 6  # tune: 6–8 is a good start
+
+PERSONA_OUTPUT_RULES = """
 STRICT OUTPUT RULES:
 Return ONLY this JSON object (no prose, no markdown, no extra keys):
 {
@@ -94,18 +72,90 @@ Return ONLY this JSON object (no prose, no markdown, no extra keys):
 Numbers must be numbers (no quotes). Booleans must be true/false (lowercase).
 Do not print long analyses; keep reasoning internal.
 """
-        )
 
-        agent = LlmAgent(
-            name=f"{archetype}_{level}_reviewer",
-            model="gemini-2.0-flash-lite",
-            instruction=instruction_text,
-            description=f"{archetype} reviewer with {level} level perspective in {category}",
-            output_key=f"{archetype}_{level}_review",
-            # 👇 Enforce tiny persona output (prevents giant blobs)
-            output_schema=PersonaMiniSchema,
-        )
-        research_agents.append(agent)
+# Names that used to be built at import time; they are now resolved lazily via
+# __getattr__ so importing this module (e.g. under uvicorn --reload) stays cheap.
+_LAZY_ATTRS = {
+    "summarizer_agent",
+    "summarize_tool",
+    "transcriber_agent",
+    "transcription_agent",
+    "research_agents",
+    "review_waves",
+    "outputSchema",
+    "verdict_aggregator",
+    "merger_agent",
+    "sequential_pipeline_agent",
+    "root_agent",
+}
+
+
+# --- Sub Agent 2: Summarizer ---
+def build_summarizer_agent() -> LlmAgent:
+    return LlmAgent(
+        name="VideoSummarizer",
+        model=gemini_model("gemini-2.5-flash-lite"),
+        instruction=load_instruction_from_file(
+            "./instructions/transcript_summarizer.txt"
+        ),
+        description="Creates concise summaries from video transcripts to reduce token usage",
+        output_key="video_summary",
+    )
+
+
+# --- Sub Agent 1: Transcriber ---
+def build_transcriber_agent(summarizer: LlmAgent) -> LlmAgent:
+    return LlmAgent(
+        name="VideoTranscriber",
+        model=gemini_model("gemini-2.0-flash-lite"),
+        instruction=load_instruction_from_file("./instructions/video_transcriber.txt"),
+        description="Transcribes audio from video files into clean, formatted text",
+        tools=[AgentTool(agent=summarizer)],
+        output_key="video_transcript",
+    )
+
+
+# --- Long videos: per-segment transcription, stitched, then summarized ---
+def build_transcription_agent(
+    transcriber: LlmAgent, summarizer: LlmAgent
+) -> SegmentedTranscriber:
+    # include_contents="none" keeps the (multi-segment) video out of the
+    # summarizer's request; the stitched transcript still reaches it once, as
+    # the SegmentedTranscriber turn that starts the current context.
+    stitched_summarizer = summarizer.clone(update={"include_contents": "none"})
+    return SegmentedTranscriber(
+        name="SegmentedTranscriber",
+        transcriber=transcriber,
+        summarizer=stitched_summarizer,
+        description="Transcribes the video, splitting long videos into parallel segments",
+    )
+
+
+# --- Create research agents with different personalities ---
+def build_research_agents() -> List[LlmAgent]:
+    # Read once; every persona formats the same template.
+    base = load_instruction_from_file("./instructions/enjoyer_instruction.txt")
+    research_agents: List[LlmAgent] = []
+    for archetype in personality_archetypes:
+        category = archetype_to_category[archetype]
+        for level in interest_levels:
+            instruction_text = (
+                base.replace("{level}", level).replace("{category}", category)
+                + PERSONA_OUTPUT_RULES
+            )
+
+            agent = LlmAgent(
+                name=f"{archetype}_{level}_reviewer",
+                # Reviewers are independent and idempotent, so stragglers may be hedged.
+                model=gemini_model("gemini-2.0-flash-lite", hedged=True),
+                instruction=instruction_text,
+                description=f"{archetype} reviewer with {level} level perspective in {category}",
+                output_key=f"{archetype}_{level}_review",
+                # 👇 Enforce tiny persona output (prevents giant blobs)
+                output_schema=PersonaMiniSchema,
+            )
+            research_agents.append(agent)
+    return research_agents
 
 
 # ---------------------------------------------
@@ -117,49 +167,119 @@ def chunk(lst, n):
         yield lst[i : i + n]
 
 
-WAVE_SIZE = 6  # tune: 6–8 is a good start
-review_waves = []
-for i, wave_agents in enumerate(chunk(research_agents, WAVE_SIZE), start=1):
-    review_waves.append(
-        ParallelAgent(
-            name=f"review_wave_{i}",
-            sub_agents=wave_agents,
-            description=f"Reviewer wave #{i} (size={len(wave_agents)})",
+def build_review_waves(research_agents: List[LlmAgent]) -> List[ParallelAgent]:
+    review_waves = []
+    for i, wave_agents in enumerate(chunk(research_agents, WAVE_SIZE), start=1):
+        review_waves.append(
+            ParallelAgent(
+                name=f"review_wave_{i}",
+                sub_agents=wave_agents,
+                description=f"Reviewer wave #{i} (size={len(wave_agents)})",
+            )
         )
-    )
+    return review_waves
 
 
 # --- Output schema for the merger (the big final object you already use) ---
-class outputSchema(BaseModel):
-    output: str = Field(
-        description=load_instruction_from_file("./instructions/outputschema.txt")
+@functools.lru_cache(maxsize=1)
+def get_output_schema() -> Type[BaseModel]:
+    return create_model(
+        "outputSchema",
+        output=(
+            str,
+            Field(
+                description=load_instruction_from_file(
+                    "./instructions/outputschema.txt"
+                )
+            ),
+        ),
     )
 
 
+# --- Verdict aggregation (no LLM) ---
+# REVIEW_LEVEL_WEIGHTS, e.g. "beginner=1,intermediate=1.5,expert=2", weights the
+# reviewers' engagement scores by interest level (default: equal weights).
+def build_verdict_aggregator() -> VerdictAggregator:
+    return VerdictAggregator(
+        name="verdict_aggregator",
+        archetypes=personality_archetypes,
+        levels=interest_levels,
+        level_weights=weights_from_env("REVIEW_LEVEL_WEIGHTS"),
+        description="Computes exact retention/view/like statistics over all persona verdicts.",
+    )
+
+
+MERGER_CONTEXT = """
+
+PRE-COMPUTED REVIEWER STATISTICS (exact; use these numbers as given, do not recompute):
+{review_stats}
+
+VIDEO CONTENT (summary, or the transcript when no summary was made):
+{video_context}
+"""
+
+
 # --- Merger Agent ---
-# TIP in your synthesis_prompt.txt:
-# - Read only persona keys that end with "_review".
-# - Ignore any missing keys (some personas may fail).
-# - Produce exactly ONE final JSON into output_key="final_summary".
-merger_agent = LlmAgent(
-    name="merger_agent",
-    model="gemini-2.5-flash-lite",
-    instruction=load_instruction_from_file("./instructions/synthesis_prompt.txt"),
-    description="Merges and synthesizes outputs from multiple reviewer agents into a cohesive final output.",
-    output_schema=outputSchema,
-    output_key="final_summary",
-)
+# The raw "_review" outputs are not in the merger's prompt: it works from the
+# aggregated statistics (including the compact per-reviewer table) and the
+# video summary or transcript only (include_contents="none").
+# Produces exactly ONE final JSON into output_key="final_summary".
+def build_merger_agent() -> LlmAgent:
+    return LlmAgent(
+        name="merger_agent",
+        model=gemini_model("gemini-2.5-flash-lite"),
+        instruction=load_instruction_from_file("./instructions/synthesis_prompt.txt")
+        + MERGER_CONTEXT,
+        description="Merges and synthesizes outputs from multiple reviewer agents into a cohesive final output.",
+        include_contents="none",
+        output_schema=get_output_schema(),
+        output_key="final_summary",
+    )
+
 
 # --- Sequential Pipeline (unchanged pattern) ---
 # Just insert the waves instead of one massive parallel.
-sequential_pipeline_agent = SequentialAgent(
-    name="VideoAnalysisPipeline",
-    sub_agents=[
-        transcriber_agent,  # Phase 1
-        *review_waves,  # Phase 2: multiple small ParallelAgent batches
-        merger_agent,  # Phase 3
-    ],
-    description="Coordinates video processing, batched parallel reviews, and synthesis.",
-)
-
-root_agent = sequential_pipeline_agent
+@functools.lru_cache(maxsize=1)
+def get_pipeline() -> dict:
+    """Builds the agent graph once per process and returns its named parts."""
+    summarizer_agent = build_summarizer_agent()
+    transcriber_agent = build_transcriber_agent(summarizer_agent)
+    transcription_agent = build_transcription_agent(transcriber_agent, summarizer_agent)
+    research_agents = build_research_agents()
+    review_waves = build_review_waves(research_agents)
+    verdict_aggregator = build_verdict_aggregator()
+    merger_agent = build_merger_agent()
+
+    sequential_pipeline_agent = SequentialAgent(
+        name="VideoAnalysisPipeline",
+        sub_agents=[
+            transcription_agent,  # Phase 1 (segment-parallel for long videos)
+            *review_waves,  # Phase 2: multiple small ParallelAgent batches
+            verdict_aggregator,  # Phase 3a: deterministic statistics
+            merger_agent,  # Phase 3b
+        ],
+        description="Coordinates video processing, batched parallel reviews, and synthesis.",
+    )
+    return {
+        "summarizer_agent": summarizer_agent,
+        "summarize_tool": transcriber_agent.tools[0],
+        "transcriber_agent": transcriber_agent,
+        "transcription_agent": transcription_agent,
+        "research_agents": research_agents,
+        "review_waves": review_waves,
+        "outputSchema": get_output_schema(),
+        "verdict_aggregator": verdict_aggregator,
+        "merger_agent": merger_agent,
+        "sequential_pipeline_agent": sequential_pipeline_agent,
+        "root_agent": sequential_pipeline_agent,
+    }
+
+
+def get_root_agent() -> SequentialAgent:
+    return get_pipeline()["root_agent"]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRS:
+        return get_pipeline()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
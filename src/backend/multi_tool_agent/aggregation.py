@@ -0,0 +1,244 @@
+import json
+from typing import Any, AsyncGenerator, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+# ADK
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+# Engagement score per reviewer: a weighted blend of the three verdict fields.
+SCORE_WEIGHTS = {"retention": 0.5, "viewed": 0.25, "liked": 0.25}
+# Reviewers whose retention has a robust (median/MAD) z-score above this are
+# reported as outliers and excluded from the trimmed mean.
+OUTLIER_Z = 3.5
+TRIM_FRACTION = 0.1
+ROUND_DIGITS = 4
+# Column order of the compact per-reviewer table handed to the merger.
+REVIEWER_COLUMNS = ["vertical", "level", "retention", "viewed", "liked", "score"]
+
+
+def _parse_review(value: Any) -> Optional[Dict[str, Any]]:
+    """Accepts a verdict as stored by ADK (dict, pydantic model or JSON string)."""
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    if not isinstance(value, dict):
+        return None
+    try:
+        return {
+            "retention": min(1.0, max(0.0, float(value["retention"]))),
+            "viewed": bool(value["viewed"]),
+            "liked": bool(value["liked"]),
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _round(x: float) -> float:
+    return round(float(x), ROUND_DIGITS)
+
+
+def _group_stats(retention: np.ndarray, viewed: np.ndarray, liked: np.ndarray) -> Dict:
+    score = (
+        SCORE_WEIGHTS["retention"] * retention
+        + SCORE_WEIGHTS["viewed"] * viewed
+        + SCORE_WEIGHTS["liked"] * liked
+    )
+    return {
+        "n": int(retention.size),
+        "mean_retention": _round(retention.mean()),
+        "retention_variance": _round(retention.var()),
+        "view_rate": _round(viewed.mean()),
+        "like_rate": _round(liked.mean()),
+        "mean_score": _round(score.mean()),
+    }
+
+
+def _trimmed_mean(values: np.ndarray, fraction: float) -> float:
+    k = int(values.size * fraction)
+    ordered = np.sort(values)
+    return (
+        ordered[k : values.size - k].mean() if values.size > 2 * k else ordered.mean()
+    )
+
+
+def aggregate_reviews(
+    state: Mapping[str, Any],
+    archetypes: Sequence[str],
+    levels: Sequence[str],
+    level_weights: Optional[Mapping[str, float]] = None,
+) -> Dict[str, Any]:
+    """Computes exact reviewer statistics from `{archetype}_{level}_review` state keys.
+
+    Returns overall, per-category and per-level retention/view/like rates, the
+    engagement score, variance, a trimmed mean, retention outliers and a compact
+    per-reviewer table. `weighted_score` (score averaged with `level_weights`) is
+    only included when the weights are not uniform. Reviewers that failed or
+    returned malformed output are listed under `missing`.
+    """
+    names: List[str] = []
+    cats: List[int] = []
+    lvls: List[int] = []
+    rows: List[List[float]] = []
+    missing: List[str] = []
+    for a, archetype in enumerate(archetypes):
+        for l, level in enumerate(levels):
+            name = f"{archetype}_{level}"
+            review = _parse_review(state.get(f"{name}_review"))
+            if review is None:
+                missing.append(name)
+                continue
+            names.append(name)
+            cats.append(a)
+            lvls.append(l)
+            rows.append([review["retention"], review["viewed"], review["liked"]])
+
+    stats: Dict[str, Any] = {
+        "reviewers": len(names),
+        "expected_reviewers": len(archetypes) * len(levels),
+        "missing": missing,
+        "score_weights": SCORE_WEIGHTS,
+    }
+    if not rows:
+        return stats
+
+    data = np.asarray(rows, dtype=np.float64)
+    retention, viewed, liked = data[:, 0], data[:, 1], data[:, 2]
+    cat_idx = np.asarray(cats)
+    lvl_idx = np.asarray(lvls)
+
+    weights = np.asarray(
+        [(level_weights or {}).get(levels[i], 1.0) for i in lvls], dtype=np.float64
+    )
+    weighted = bool(np.any(weights != weights[0]))
+    score = (
+        SCORE_WEIGHTS["retention"] * retention
+        + SCORE_WEIGHTS["viewed"] * viewed
+        + SCORE_WEIGHTS["liked"] * liked
+    )
+
+    median = np.median(retention)
+    mad = np.median(np.abs(retention - median))
+    robust_z = (
+        0.6745 * (retention - median) / mad if mad > 0 else np.zeros_like(retention)
+    )
+    outlier_mask = np.abs(robust_z) > OUTLIER_Z
+
+    overall = _group_stats(retention, viewed, liked)
+    overall.update(
+        {
+            "retention_std": _round(retention.std()),
+            "median_retention": _round(median),
+            "trimmed_mean_retention": _round(
+                _trimmed_mean(retention[~outlier_mask], TRIM_FRACTION)
+            ),
+        }
+    )
+    if weighted:
+        overall["weighted_score"] = _round(np.average(score, weights=weights))
+        stats["level_weights"] = {
+            level: float((level_weights or {}).get(level, 1.0)) for level in levels
+        }
+    stats["overall"] = overall
+    stats["by_category"] = {
+        archetype: _group_stats(
+            retention[cat_idx == a], viewed[cat_idx == a], liked[cat_idx == a]
+        )
+        for a, archetype in enumerate(archetypes)
+        if np.any(cat_idx == a)
+    }
+    stats["by_level"] = {
+        level: _group_stats(
+            retention[lvl_idx == l], viewed[lvl_idx == l], liked[lvl_idx == l]
+        )
+        for l, level in enumerate(levels)
+        if np.any(lvl_idx == l)
+    }
+    stats["outliers"] = [
+        {
+            "reviewer": names[i],
+            "retention": _round(retention[i]),
+            "robust_z": _round(robust_z[i]),
+        }
+        for i in np.flatnonzero(outlier_mask)
+    ]
+    stats["per_reviewer"] = {
+        "columns": REVIEWER_COLUMNS,
+        "rows": [
+            [
+                archetypes[cats[i]],
+                levels[lvls[i]],
+                _round(retention[i]),
+                int(viewed[i]),
+                int(liked[i]),
+                _round(score[i]),
+            ]
+            for i in range(len(names))
+        ],
+    }
+    return stats
+
+
+def partial_report(
+    state: Mapping[str, Any], archetypes: Sequence[str], levels: Sequence[str]
+) -> Dict[str, Any]:
+    """What can be returned when a run stops before the merger.
+
+    Holds the video summary (if produced), each verdict received so far and
+    statistics over those verdicts.
+    """
+    personas = []
+    for archetype in archetypes:
+        for level in levels:
+            review = _parse_review(state.get(f"{archetype}_{level}_review"))
+            if review is not None:
+                personas.append({"vertical": archetype, "level": level, **review})
+    return {
+        "video_summary": state.get("video_summary"),
+        "personas": personas,
+        "review_stats": aggregate_reviews(state, archetypes, levels),
+    }
+
+
+class VerdictAggregator(BaseAgent):
+    """Deterministically aggregates persona verdicts into `review_stats`.
+
+    Runs between the review waves and the merger so the merger reads a compact,
+    exact statistics block instead of every raw reviewer output. Also writes
+    `video_context`: the video summary, or the transcript when the transcriber
+    did not summarize, so the merger always has the video's content.
+    """
+
+    archetypes: List[str]
+    levels: List[str]
+    level_weights: Dict[str, float] = {}
+    output_key: str = "review_stats"
+    context_key: str = "video_context"
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        stats = aggregate_reviews(
+            state, self.archetypes, self.levels, self.level_weights
+        )
+        video_context = state.get("video_summary") or state.get("video_transcript")
+        # State-only event: the stats reach the merger through its instruction
+        # template, not as conversation content.
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(
+                state_delta={
+                    self.output_key: json.dumps(stats, separators=(",", ":")),
+                    self.context_key: video_context or "",
+                }
+            ),
+        )
@@ -0,0 +1,124 @@
+"""Hedged requests for straggler reviewer calls.
+
+A hedged call starts normally. If it has not answered by the model's tracked
+latency percentile, a duplicate is sent, the first answer wins and the other
+is cancelled. Duplicates go through the global rate limiter like any other
+call, and a token budget caps them at a fraction of all hedged calls: each
+call adds `budget_ratio` tokens (up to `burst`) and each duplicate spends one.
+
+Configuration (environment):
+- LLM_HEDGING: "1" enables hedging for reviewer calls (default "0").
+- LLM_HEDGE_PERCENTILE: latency percentile that triggers a duplicate (default 95).
+- LLM_HEDGE_BUDGET: max duplicates per call, as a ratio (default 0.1 = 10%).
+- LLM_HEDGE_MIN_SAMPLES: latencies needed before hedging a model (default 20).
+- LLM_HEDGE_MIN_DELAY_SEC: never hedge earlier than this (default 1.0).
+"""
+
+import functools
+import os
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+LATENCY_WINDOW = 200
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies for one model."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100.0))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """Token bucket limiting duplicates to `ratio` of calls, with a small burst."""
+
+    def __init__(self, ratio: float, burst: float = 5.0):
+        self.ratio = max(0.0, ratio)
+        self.burst = max(1.0, burst)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def on_call(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class HedgingPolicy:
+    """Decides when (and whether) to send a duplicate of a slow model call."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 95.0,
+        budget_ratio: float = 0.1,
+        min_samples: int = 20,
+        min_delay_sec: float = 1.0,
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = max(1, min_samples)
+        self.min_delay_sec = max(0.0, min_delay_sec)
+        self.budget = HedgeBudget(budget_ratio)
+        self._latencies: Dict[str, LatencyTracker] = {}
+        # Called with (model, outcome) for "issued", "won", "lost" and
+        # "no_budget" so the API layer can export counters.
+        self.on_hedge: Optional[Callable[[str, str], None]] = None
+
+    def _tracker(self, model: str) -> LatencyTracker:
+        tracker = self._latencies.get(model)
+        if tracker is None:
+            tracker = self._latencies[model] = LatencyTracker()
+        return tracker
+
+    def record(self, model: str, seconds: float) -> None:
+        """Records a call's latency from when it was first sent to its answer."""
+        self._tracker(model).record(seconds)
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a call to `model`; None to never hedge.
+
+        Also credits the hedge budget for this call.
+        """
+        if not self.enabled:
+            return None
+        self.budget.on_call()
+        tracker = self._tracker(model)
+        if len(tracker) < self.min_samples:
+            return None
+        return max(self.min_delay_sec, tracker.percentile(self.percentile))
+
+    def notify(self, model: str, outcome: str) -> None:
+        if self.on_hedge is not None:
+            self.on_hedge(model, outcome)
+
+
+@functools.lru_cache(maxsize=1)
+def get_hedging_policy() -> HedgingPolicy:
+    return HedgingPolicy(
+        enabled=os.getenv("LLM_HEDGING", "0") == "1",
+        percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95") or "95"),
+        budget_ratio=float(os.getenv("LLM_HEDGE_BUDGET", "0.1") or "0.1"),
+        min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20") or "20"),
+        min_delay_sec=float(os.getenv("LLM_HEDGE_MIN_DELAY_SEC", "1.0") or "1.0"),
+    )
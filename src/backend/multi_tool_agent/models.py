@@ -0,0 +1,147 @@
+import asyncio
+import functools
+import time
+from typing import AsyncGenerator, Callable, List, Optional, Tuple
+
+# ADK
+from google.adk.models import Gemini, LlmRequest, LlmResponse
+
+from .hedging import get_hedging_policy
+from .rate_limit import get_rate_limiter
+
+
+class RateLimitedGemini(Gemini):
+    """Gemini model whose calls all go through the process-wide rate limiter."""
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if stream:
+            async with get_rate_limiter().slot():
+                async for response in super().generate_content_async(
+                    llm_request, stream
+                ):
+                    yield response
+            return
+
+        # ADK runs tool calls (e.g. the summarizer AgentTool, itself a model
+        # call) while this generator is suspended at `yield`, so the slot must
+        # be released before yielding or nested calls can starve their parents.
+        for response in await self._generate_once(llm_request):
+            yield response
+
+    async def _generate_once(
+        self, llm_request: LlmRequest, on_sent: Optional[Callable[[], None]] = None
+    ) -> List[LlmResponse]:
+        """One non-streaming call under a rate-limiter slot.
+
+        `on_sent` is called once the slot is held, i.e. when the call is
+        actually sent rather than queued.
+        """
+        async with get_rate_limiter().slot():
+            if on_sent is not None:
+                on_sent()
+            return [
+                response
+                async for response in super().generate_content_async(
+                    llm_request, False
+                )
+            ]
+
+
+class HedgedGemini(RateLimitedGemini):
+    """Rate-limited Gemini that hedges slow non-streaming calls (see hedging.py)."""
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        policy = get_hedging_policy()
+        delay = None if stream else policy.hedge_delay(self.model)
+        if delay is None:
+            if stream:
+                async for response in super().generate_content_async(
+                    llm_request, stream
+                ):
+                    yield response
+                return
+            responses, seconds = await self._timed(llm_request)
+            policy.record(self.model, seconds)
+        else:
+            responses = await self._hedged(llm_request, delay)
+        for response in responses:
+            yield response
+
+    async def _timed(
+        self, llm_request: LlmRequest, sent: Optional[asyncio.Event] = None
+    ) -> Tuple[List[LlmResponse], float]:
+        """Returns the responses and the seconds the call took once sent."""
+        sent_at = time.perf_counter()
+
+        def on_sent() -> None:
+            nonlocal sent_at
+            sent_at = time.perf_counter()
+            if sent is not None:
+                sent.set()
+
+        responses = await self._generate_once(llm_request, on_sent)
+        return responses, time.perf_counter() - sent_at
+
+    async def _hedged(self, llm_request: LlmRequest, delay: float) -> List[LlmResponse]:
+        policy = get_hedging_policy()
+        sent = asyncio.Event()
+        primary = asyncio.create_task(self._timed(llm_request, sent))
+        waiter = asyncio.create_task(sent.wait())
+        hedge = None
+        tasks = {primary}
+        try:
+            # The hedge timer starts when the primary is sent, not while it
+            # waits for a rate-limiter slot.
+            await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            sent_at = time.perf_counter()
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                if policy.budget.try_spend():
+                    policy.notify(self.model, "issued")
+                    # The duplicate gets its own copy, since the Gemini client
+                    # normalises requests in place (idempotently). It is made
+                    # only here because it includes the inline clip.
+                    hedge_request = llm_request.model_copy(deep=True)
+                    hedge = asyncio.create_task(self._timed(hedge_request))
+                    tasks.add(hedge)
+                else:
+                    policy.notify(self.model, "no_budget")
+
+            # The first successful answer wins; an error is raised only once
+            # every attempt has failed.
+            while True:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                succeeded = [task for task in done if task.exception() is None]
+                if not succeeded and tasks:
+                    continue
+                winner = succeeded[0] if succeeded else done.pop()
+                responses, seconds = winner.result()
+                # Record the request's latency, not the winning attempt's: when
+                # the hedge wins, the primary has taken at least this long, and
+                # recording the hedge's own (short) time would bias the
+                # percentile, and so the hedge delay, low.
+                if winner is not primary:
+                    seconds = time.perf_counter() - sent_at
+                policy.record(self.model, seconds)
+                if hedge is not None:
+                    policy.notify(self.model, "won" if winner is hedge else "lost")
+                return responses
+        finally:
+            for task in (waiter, primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+
+@functools.lru_cache(maxsize=None)
+def gemini_model(model: str, hedged: bool = False) -> RateLimitedGemini:
+    """Shared model instance per name, so agents reuse one API client.
+
+    `hedged` models may duplicate slow calls when LLM_HEDGING is enabled.
+    """
+    return (HedgedGemini if hedged else RateLimitedGemini)(model=model)
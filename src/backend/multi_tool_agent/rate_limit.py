@@ -0,0 +1,252 @@
+import asyncio
+import functools
+import heapq
+import itertools
+import os
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Mapping, Optional, Tuple
+
+# Priority lanes, highest first. Unknown lanes are treated as "batch".
+LANES = ("interactive", "batch")
+DEFAULT_LANE_WEIGHTS = "interactive=8,batch=1"
+
+
+@dataclass(frozen=True)
+class Flow:
+    """Who a unit of work is done for: the tenant and its priority lane."""
+
+    tenant: str = "default"
+    lane: str = "interactive"
+
+
+# Set per request by the API layer; read by every scheduler the request's work
+# passes through (run admission, transcode pool, model calls).
+current_flow: ContextVar[Flow] = ContextVar("vega_current_flow", default=Flow())
+
+
+def parse_weights(raw: Optional[str]) -> Dict[str, float]:
+    """Parses "name=weight,name=weight" (e.g. TENANT_WEIGHTS) into a dict."""
+    weights: Dict[str, float] = {}
+    for item in (raw or "").split(","):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            weights[name.strip()] = max(0.001, float(value))
+        except ValueError:
+            continue
+    return weights
+
+
+def weights_from_env(name: str, default: str = "") -> Dict[str, float]:
+    return parse_weights(os.getenv(name, default))
+
+
+class QueueFull(Exception):
+    """Raised when a tenant already has too much work waiting on a scheduler."""
+
+
+class FairScheduler:
+    """Weighted fair queuing over a fixed number of slots.
+
+    Each (tenant, lane) flow gets a share of the slots proportional to
+    tenant_weight * lane_weight, using self-clocked fair queuing: a request is
+    tagged with a virtual finish time start + cost / weight, where start is the
+    later of the scheduler's virtual time and the flow's previous finish tag,
+    and free slots go to the smallest tag. A tenant that floods the queue only
+    pushes its own tags further out, so interactive work from others keeps its
+    place and batch work fills whatever capacity is left.
+
+    max_per_tenant caps the slots one tenant can hold at once; waiters over the
+    cap are skipped until that tenant releases a slot. max_waiting_per_tenant
+    bounds the queue per tenant (QueueFull beyond it). Zero disables either.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        lane_weights: Optional[Mapping[str, float]] = None,
+        tenant_weights: Optional[Mapping[str, float]] = None,
+        max_per_tenant: int = 0,
+        max_waiting_per_tenant: int = 0,
+        on_wait: Optional[Callable[[Flow, float], None]] = None,
+    ):
+        self.capacity = max(1, capacity)
+        self.lane_weights = dict(lane_weights or parse_weights(DEFAULT_LANE_WEIGHTS))
+        self.tenant_weights = dict(tenant_weights or {})
+        self.max_per_tenant = max(0, max_per_tenant)
+        self.max_waiting_per_tenant = max(0, max_waiting_per_tenant)
+        # Called with (flow, seconds waited) each time a slot is granted.
+        self.on_wait = on_wait
+        self._heap: List[Tuple[float, int, Flow, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._finish: Dict[Flow, float] = {}
+        self._flow_load: Counter = Counter()
+        self._active_by_tenant: Counter = Counter()
+        self._waiting_by_tenant: Counter = Counter()
+        self.active_by_lane: Counter = Counter()
+        self.waiting_by_lane: Counter = Counter()
+        self.active = 0
+
+    @property
+    def waiting(self) -> int:
+        return sum(self.waiting_by_lane.values())
+
+    def weight(self, flow: Flow) -> float:
+        lane = self.lane_weights.get(flow.lane, self.lane_weights.get("batch", 1.0))
+        return max(0.001, self.tenant_weights.get(flow.tenant, 1.0) * lane)
+
+    def _dispatch(self) -> None:
+        deferred = []
+        while self._heap and self.active < self.capacity:
+            entry = heapq.heappop(self._heap)
+            finish, _, flow, future = entry
+            if future.done():  # waiter was cancelled
+                continue
+            if (
+                self.max_per_tenant
+                and self._active_by_tenant[flow.tenant] >= self.max_per_tenant
+            ):
+                deferred.append(entry)
+                continue
+            self._virtual_time = max(self._virtual_time, finish)
+            self.active += 1
+            self._active_by_tenant[flow.tenant] += 1
+            self.active_by_lane[flow.lane] += 1
+            future.set_result(None)
+        for entry in deferred:
+            heapq.heappush(self._heap, entry)
+
+    def _forget(self, flow: Flow) -> None:
+        self._flow_load[flow] -= 1
+        if self._flow_load[flow] <= 0:
+            # Idle flows restart at the current virtual time, as in SCFQ; dropping
+            # them keeps the tag table bounded by the number of busy flows.
+            del self._flow_load[flow]
+            self._finish.pop(flow, None)
+
+    async def acquire(self, flow: Flow, cost: float = 1.0) -> None:
+        if (
+            self.max_waiting_per_tenant
+            and self._waiting_by_tenant[flow.tenant] >= self.max_waiting_per_tenant
+        ):
+            raise QueueFull(
+                f"tenant {flow.tenant!r} already has "
+                f"{self._waiting_by_tenant[flow.tenant]} requests waiting"
+            )
+        start = max(self._virtual_time, self._finish.get(flow, 0.0))
+        finish = start + max(cost, 0.001) / self.weight(flow)
+        self._finish[flow] = finish
+        self._flow_load[flow] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (finish, next(self._seq), flow, future))
+        self._waiting_by_tenant[flow.tenant] += 1
+        self.waiting_by_lane[flow.lane] += 1
+        queued_at = time.perf_counter()
+        try:
+            self._dispatch()
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted and cancelled in the same tick: hand the slot back.
+                self.release(flow)
+            else:
+                future.cancel()
+                self._forget(flow)
+            raise
+        finally:
+            self._waiting_by_tenant[flow.tenant] -= 1
+            if self._waiting_by_tenant[flow.tenant] <= 0:
+                del self._waiting_by_tenant[flow.tenant]
+            self.waiting_by_lane[flow.lane] -= 1
+        if self.on_wait is not None:
+            self.on_wait(flow, time.perf_counter() - queued_at)
+
+    def release(self, flow: Flow) -> None:
+        self.active -= 1
+        self._active_by_tenant[flow.tenant] -= 1
+        if self._active_by_tenant[flow.tenant] <= 0:
+            del self._active_by_tenant[flow.tenant]
+        self.active_by_lane[flow.lane] -= 1
+        self._forget(flow)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, flow: Optional[Flow] = None, cost: float = 1.0):
+        """Holds one slot for the current (or given) flow for the block."""
+        flow = flow or current_flow.get()
+        await self.acquire(flow, cost)
+        try:
+            yield
+        finally:
+            self.release(flow)
+
+
+class LlmRateLimiter:
+    """Process-wide gate for model calls: a concurrency cap plus an optional
+    requests-per-minute budget. Waiters are served in weighted-fair order
+    across tenants and priority lanes (see FairScheduler)."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: int = 0,
+        max_per_tenant: int = 0,
+        lane_weights: Optional[Mapping[str, float]] = None,
+        tenant_weights: Optional[Mapping[str, float]] = None,
+    ):
+        self.scheduler = FairScheduler(
+            max_concurrency,
+            lane_weights=lane_weights,
+            tenant_weights=tenant_weights,
+            max_per_tenant=max_per_tenant,
+        )
+        self.max_concurrency = self.scheduler.capacity
+        self.requests_per_minute = max(0, requests_per_minute)
+        self._rpm_lock = asyncio.Lock()
+        self._recent_starts: Deque[float] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return self.scheduler.waiting
+
+    @property
+    def active(self) -> int:
+        return self.scheduler.active
+
+    async def _respect_rpm(self) -> None:
+        if not self.requests_per_minute:
+            return
+        async with self._rpm_lock:
+            while True:
+                now = time.monotonic()
+                while self._recent_starts and now - self._recent_starts[0] >= 60.0:
+                    self._recent_starts.popleft()
+                if len(self._recent_starts) < self.requests_per_minute:
+                    self._recent_starts.append(now)
+                    return
+                await asyncio.sleep(60.0 - (now - self._recent_starts[0]))
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds one model-call slot for the duration of the block."""
+        async with self.scheduler.slot():
+            await self._respect_rpm()
+            yield
+
+
+@functools.lru_cache(maxsize=1)
+def get_rate_limiter() -> LlmRateLimiter:
+    return LlmRateLimiter(
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16") or "16"),
+        requests_per_minute=int(os.getenv("LLM_RPM", "0") or "0"),
+        max_per_tenant=int(os.getenv("LLM_MAX_CONCURRENCY_PER_TENANT", "0") or "0"),
+        lane_weights=weights_from_env("ADMISSION_LANE_WEIGHTS", DEFAULT_LANE_WEIGHTS),
+        tenant_weights=weights_from_env("TENANT_WEIGHTS"),
+    )
@@ -0,0 +1,232 @@
+import difflib
+import re
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+# ADK
+from google.adk.agents import BaseAgent, LlmAgent, ParallelAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.models import LlmRequest
+from google.adk.plugins.base_plugin import BasePlugin
+
+
+# Text part placed immediately before each segment's inline video in the user
+# message, e.g. "[video segment 2/5 start=55.0s end=115.0s]".
+SEGMENT_MARKER_RE = re.compile(
+    r"^\[video segment (\d+)/(\d+) start=([\d.]+)s end=([\d.]+)s\]$"
+)
+TIMESTAMP_RE = re.compile(r"\[(\d{1,2}):(\d{2})\]")
+
+# Overlap de-duplication: compare this many words at each seam and require at
+# least MIN_OVERLAP_WORDS matching in a row before trimming.
+SEAM_WINDOW_WORDS = 200
+MIN_OVERLAP_WORDS = 4
+WORD_RE = re.compile(r"\S+")
+
+SEGMENT_NOTE = """
+
+SEGMENTED INPUT:
+You are transcribing ONLY segment {index} of {count} of a longer video. The clip you
+receive is that segment alone; transcribe it completely. Timestamps must be
+relative to the start of this clip, starting at [00:00]. Do not call any tools
+and do not summarize; output only the transcript.
+"""
+
+
+def segment_marker(index: int, count: int, start: float, end: float) -> str:
+    return f"[video segment {index}/{count} start={start:.1f}s end={end:.1f}s]"
+
+
+def parse_segments(content: Optional[types.Content]) -> List[Tuple[int, float, float]]:
+    """Returns (index, start_sec, end_sec) for every segment marker in a message."""
+    segments = []
+    for part in (content.parts if content else None) or []:
+        match = SEGMENT_MARKER_RE.match((part.text or "").strip())
+        if match:
+            segments.append(
+                (int(match.group(1)), float(match.group(3)), float(match.group(4)))
+            )
+    return segments
+
+
+def keep_only_segment(llm_request: LlmRequest, index: int) -> None:
+    """Drops every other segment's marker and media from the request, in place."""
+    for content in llm_request.contents:
+        kept = []
+        current: Optional[int] = None
+        for part in content.parts or []:
+            match = SEGMENT_MARKER_RE.match((part.text or "").strip())
+            if match:
+                current = int(match.group(1))
+            elif part.inline_data is None:
+                # Plain text after the media belongs to nobody in particular.
+                current = None if part.text else current
+            if current is None or current == index:
+                kept.append(part)
+        content.parts = kept
+
+
+def _keep_only_segment(index: int):
+    """before_model_callback form of keep_only_segment."""
+
+    def callback(callback_context: CallbackContext, llm_request: LlmRequest):
+        keep_only_segment(llm_request, index)
+        return None
+
+    return callback
+
+
+class ReviewerClipPlugin(BasePlugin):
+    """Sends reviewers one representative clip of a segmented video.
+
+    Reviewers judge the video from the transcript plus the opening clip (the
+    hook); every other segment is dropped from their requests. Without this
+    each reviewer would receive every overlapping segment. Register it before
+    ContextCachePlugin so the shared cache holds the reduced conversation.
+    """
+
+    def __init__(
+        self,
+        name: str = "reviewer_clip",
+        agent_suffix: str = "_reviewer",
+        keep_segment: int = 1,
+    ):
+        super().__init__(name)
+        self.agent_suffix = agent_suffix
+        self.keep_segment = keep_segment
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ):
+        if callback_context.agent_name.endswith(self.agent_suffix):
+            keep_only_segment(llm_request, self.keep_segment)
+        return None
+
+
+def _offset_timestamps(text: str, offset_sec: float) -> str:
+    def shift(match: re.Match) -> str:
+        total = int(match.group(1)) * 60 + int(match.group(2)) + int(offset_sec)
+        return f"[{total // 60:02d}:{total % 60:02d}]"
+
+    return TIMESTAMP_RE.sub(shift, text) if offset_sec else text
+
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def stitch_transcripts(pieces: List[Tuple[float, str]]) -> str:
+    """Joins per-segment transcripts in time order, removing text repeated in
+    the overlap between consecutive windows.
+
+    Each seam is resolved by the longest run of matching words between the
+    tail of the text so far and the head of the next segment; the duplicate
+    run is kept once, and line breaks inside each piece are preserved.
+    Segment-relative [MM:SS] timestamps are shifted to the full-video timeline
+    first.
+    """
+    stitched = ""
+    for start, text in sorted(pieces, key=lambda p: p[0]):
+        text = _offset_timestamps(text or "", start).strip()
+        if not text:
+            continue
+        if not stitched:
+            stitched = text
+            continue
+        # Only the words at the seam are compared and cut; the whitespace and
+        # line breaks of both pieces are kept as they were.
+        tail = list(WORD_RE.finditer(stitched))[-SEAM_WINDOW_WORDS:]
+        head = list(WORD_RE.finditer(text))[:SEAM_WINDOW_WORDS]
+        matcher = difflib.SequenceMatcher(
+            None,
+            [_normalize_word(m.group()) for m in tail],
+            [_normalize_word(m.group()) for m in head],
+            autojunk=False,
+        )
+        match = matcher.find_longest_match(0, len(tail), 0, len(head))
+        if match.size >= MIN_OVERLAP_WORDS:
+            stitched = stitched[: tail[match.a].start()] + text[head[match.b].start() :]
+        else:
+            stitched = stitched + "\n" + text
+    return stitched
+
+
+class SegmentedTranscriber(BaseAgent):
+    """Transcribes long videos as overlapping segments in parallel.
+
+    When the user message carries segment markers (see main.segment_video_bytes),
+    one transcriber clone per segment runs concurrently, each seeing only its own
+    clip. The partial transcripts are stitched into `video_transcript` and then
+    summarized into `video_summary`. Otherwise the regular single-pass
+    transcriber runs unchanged.
+    """
+
+    transcriber: LlmAgent
+    summarizer: LlmAgent
+
+    def __init__(self, name: str, transcriber: LlmAgent, summarizer: LlmAgent, **kw):
+        super().__init__(
+            name=name,
+            transcriber=transcriber,
+            summarizer=summarizer,
+            sub_agents=[transcriber, summarizer],
+            **kw,
+        )
+
+    def _segment_agent(self, index: int, count: int) -> LlmAgent:
+        return self.transcriber.clone(
+            update={
+                "name": f"{self.transcriber.name}_segment_{index}",
+                "instruction": self.transcriber.instruction
+                + SEGMENT_NOTE.format(index=index, count=count),
+                "tools": [],
+                "output_key": f"video_transcript_segment_{index}",
+                "before_model_callback": _keep_only_segment(index),
+            }
+        )
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        segments = parse_segments(ctx.user_content)
+        if len(segments) <= 1:
+            async for event in self.transcriber.run_async(ctx):
+                yield event
+            return
+
+        segment_agents = {
+            f"{self.transcriber.name}_segment_{index}": (index, start)
+            for index, start, _ in segments
+        }
+        fan_out = ParallelAgent(
+            name=f"{self.name}_segments",
+            sub_agents=[
+                self._segment_agent(index, len(segments)) for index, _, _ in segments
+            ],
+        )
+        texts: Dict[str, str] = {}
+        async for event in fan_out.run_async(ctx):
+            if event.author in segment_agents and event.is_final_response():
+                text = "".join(
+                    p.text for p in (event.content.parts if event.content else []) if p.text
+                )
+                if text:
+                    texts[event.author] = text
+            yield event
+
+        transcript = stitch_transcripts(
+            [(segment_agents[author][1], text) for author, text in texts.items()]
+        )
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=transcript)]),
+            actions=EventActions(state_delta={"video_transcript": transcript}),
+        )
+
+        async for event in self.summarizer.run_async(ctx):
+            yield event
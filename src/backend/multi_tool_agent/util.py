@@ -12,22 +12,111 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import hashlib
+import json
+import logging
 import os
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INSTRUCTIONS_DIR = os.path.join(os.path.dirname(__file__), "instructions")
+BUNDLE_PATH = os.path.join(INSTRUCTIONS_DIR, "bundle.json")
+
+
+def _file_signature(filepath: str) -> Dict[str, int]:
+    st = os.stat(filepath)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def build_instruction_bundle(path: str = BUNDLE_PATH) -> Dict[str, dict]:
+    """Writes every instruction file, with its hash and stat signature, into one JSON file."""
+    entries: Dict[str, dict] = {}
+    for name in sorted(os.listdir(INSTRUCTIONS_DIR)):
+        filepath = os.path.join(INSTRUCTIONS_DIR, name)
+        if not name.endswith(".txt") or not os.path.isfile(filepath):
+            continue
+        with open(filepath, "r", encoding="utf-8") as f:
+            text = f.read()
+        entries[f"./instructions/{name}"] = {
+            "sha256": content_hash(text),
+            "text": text,
+            **_file_signature(filepath),
+        }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False)
+    return entries
+
+
+@functools.lru_cache(maxsize=1)
+def _load_bundle() -> Dict[str, dict]:
+    if os.getenv("INSTRUCTION_BUNDLE", "1") == "0" or not os.path.exists(BUNDLE_PATH):
+        return {}
+    try:
+        with open(BUNDLE_PATH, "r", encoding="utf-8") as f:
+            bundle = json.load(f)
+        logger.debug("Loaded instruction bundle with %d entries", len(bundle))
+        return bundle
+    except Exception as e:
+        logger.warning("Ignoring unreadable instruction bundle %s: %s", BUNDLE_PATH, e)
+        return {}
+
+
+def _from_bundle(filename: str, filepath: str) -> Optional[str]:
+    entry = _load_bundle().get(filename)
+    if not entry:
+        return None
+    try:
+        # A stat is far cheaper than a read; a match means the bundle is fresh.
+        signature = _file_signature(filepath)
+    except OSError:
+        return entry["text"]
+    if signature["size"] == entry.get("size") and signature["mtime_ns"] == entry.get(
+        "mtime_ns"
+    ):
+        return entry["text"]
+    # mtimes differ after a fresh checkout or an image COPY even when nothing
+    # changed, so the content hash decides.
+    if signature["size"] == entry.get("size"):
+        with open(filepath, "r", encoding="utf-8") as f:
+            if content_hash(f.read()) == entry.get("sha256"):
+                return entry["text"]
+    logger.info("Instruction bundle is stale for %s; reading file", filename)
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _read_instruction(filename: str) -> str:
+    filepath = os.path.join(os.path.dirname(__file__), filename)
+    text = _from_bundle(filename, filepath)
+    if text is not None:
+        return text
+    with open(filepath, "r", encoding="utf-8") as f:
+        text = f.read()
+    logger.debug("Successfully loaded instruction from %s", filename)
+    return text
 
 
 def load_instruction_from_file(
     filename: str, default_instruction: str = "Default instruction."
 ) -> str:
-    """Reads instruction text from a file relative to this script."""
-    instruction = default_instruction
+    """Reads instruction text from a file relative to this script.
+
+    Contents are cached per process and served from the prebuilt bundle
+    (see scripts/build_instruction_bundle.py) when it is present and fresh.
+    """
+    filepath = os.path.join(os.path.dirname(__file__), filename)
     try:
-        # Construct path relative to the current script file (__file__)
-        filepath = os.path.join(os.path.dirname(__file__), filename)
-        with open(filepath, "r", encoding="utf-8") as f:
-            instruction = f.read()
-        print(f"Successfully loaded instruction from {filename}")
+        return _read_instruction(filename)
     except FileNotFoundError:
-        print(f"WARNING: Instruction file not found: {filepath}. Using default.")
+        logger.warning("Instruction file not found: %s. Using default.", filepath)
     except Exception as e:
-        print(f"ERROR loading instruction file {filepath}: {e}. Using default.")
-    return instruction
+        logger.error(
+            "Error loading instruction file %s: %s. Using default.", filepath, e
+        )
+    return default_instruction
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Measure cold-start cost of the backend in fresh interpreters.
+
+Each sample runs in a new process (as a new autoscaled/serverless worker
+would) and reports:
+- import: `import multi_tool_agent.agent` (should not build any agents)
+- build:  first `get_root_agent()` (the 27 reviewers, waves and merger)
+- app:    `import main` (FastAPI app, plugins, logging/tracing setup)
+
+Usage: python scripts/bench_import.py [--runs N] [--no-bundle]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import multi_tool_agent.agent as agent_module
+t1 = time.perf_counter()
+agent_module.get_root_agent()
+t2 = time.perf_counter()
+import main
+t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "build": t2 - t1, "app": t3 - t2}))
+"""
+
+
+def run_once(env) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--no-bundle", action="store_true", help="ignore instructions/bundle.json"
+    )
+    args = parser.parse_args()
+
+    env = dict(os.environ, LOG_LEVEL="WARNING")
+    if args.no_bundle:
+        env["INSTRUCTION_BUNDLE"] = "0"
+
+    samples = [run_once(env) for _ in range(args.runs)]
+    for phase in ("import", "build", "app"):
+        values = [s[phase] * 1000 for s in samples]
+        print(
+            f"[{phase:>6}] median={statistics.median(values):8.1f} ms "
+            f"min={min(values):8.1f} ms max={max(values):8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
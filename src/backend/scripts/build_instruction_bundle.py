@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""Precompile multi_tool_agent/instructions/*.txt into a single bundle.json.
+
+Workers then read one file at start-up instead of one per instruction. The
+bundle records each file's size, mtime and sha256: a matching size/mtime is
+trusted as is, otherwise the content hash decides, so edited instructions are
+picked up from disk until the bundle is rebuilt while a checkout that only
+changed mtimes still uses the bundle.
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from multi_tool_agent.util import BUNDLE_PATH, build_instruction_bundle  # noqa: E402
+
+
+def main():
+    entries = build_instruction_bundle()
+    for name, entry in entries.items():
+        print(
+            f"[BUNDLE] {name} sha256={entry['sha256'][:12]} chars={len(entry['text'])}"
+        )
+    print(f"[DONE] Wrote {len(entries)} instruction(s) to {BUNDLE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,25 @@
 #!/usr/bin/env python3
+"""Re-normalizes double-encoded results in persisted run files.
+
+Reads every run file in VEGA_DATA_DIR (default src/backend/data), plain
+*.json or zstd-compressed *.json.zst, and rewrites it in the same format if
+its result changes. The json_objects.jsonl[.zst] object log is not a run file
+and is left alone.
+"""
 import json
+import os
+import sys
 from pathlib import Path
 from typing import Any
 import copy
 
-DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from serialization import compress, dumps, read_payload  # noqa: E402
+
+DATA_DIR = Path(os.getenv("VEGA_DATA_DIR") or BACKEND_DIR / "data")
+RUN_FILE_PATTERNS = ("*.json", "*.json.zst")
 
 
 def _extract_json_objects_from_text(text: str) -> list:
@@ -157,8 +172,7 @@ def process_file(fp: Path) -> bool:
     Returns True if file was modified.
     """
     try:
-        with fp.open("r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = read_payload(fp)
     except Exception as e:
         print(f"[SKIP] Failed to read {fp.name}: {e}")
         return False
@@ -187,9 +201,7 @@ def process_file(fp: Path) -> bool:
 
     data["result"] = normalized
     try:
-        with fp.open("w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-            f.write("\n")
+        _write_like(fp, data)
         print(f"[FIXED] {fp.name}")
         return True
     except Exception as e:
@@ -197,6 +209,16 @@ def process_file(fp: Path) -> bool:
         return False
 
 
+def _write_like(fp: Path, value: Any) -> None:
+    """Rewrites `fp` atomically, keeping its zstd compression if it had any."""
+    data = dumps(value)
+    if fp.name.endswith(".zst"):
+        data = compress(data, "zstd")
+    tmp = fp.with_name(fp.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, fp)
+
+
 def main():
     if not DATA_DIR.exists():
         print(f"[INFO] Data directory not found: {DATA_DIR}")
@@ -204,9 +226,10 @@ def main():
 
     modified = 0
     total = 0
-    for fp in sorted(DATA_DIR.glob("*.json")):
-        # Skip non-session aggregate files if any
-        if fp.name == "json_objects.json":
+    files = sorted(fp for pattern in RUN_FILE_PATTERNS for fp in DATA_DIR.glob(pattern))
+    for fp in files:
+        # Legacy aggregate array from before the object log moved to .jsonl
+        if fp.name.startswith("json_objects."):
             continue
         total += 1
         if process_file(fp):
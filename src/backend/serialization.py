@@ -0,0 +1,263 @@
+"""Fast JSON encoding for run results, persisted payloads and HTTP responses.
+
+Everything is encoded with orjson (compact, UTF-8 bytes). Run files are written
+as one compact document each; extracted reviewer objects are appended to
+data/json_objects.jsonl, one per line, instead of rewriting a growing array.
+
+Responses are compressed when the client's Accept-Encoding allows it, preferring
+br, then zstd, then gzip. Brotli and zstd need the optional `brotli` and
+`zstandard` packages; without them those encodings are simply not offered.
+
+Configuration (environment):
+- PERSIST_COMPRESSION: "none" (default) or "zstd" for *.json.zst run files and
+  a *.jsonl.zst object log (falls back to plain JSON if zstandard is missing).
+- RESPONSE_COMPRESS_MIN_BYTES: smaller bodies are sent as-is (default 1024).
+"""
+
+import dataclasses
+import datetime
+import gzip
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import orjson
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+_append_lock = threading.Lock()
+
+
+@dataclasses.dataclass
+class RunMeta:
+    app_name: str
+    user_id: str
+    session_id: str
+    created_at: str
+
+
+@dataclasses.dataclass
+class RunRecord:
+    """What is persisted per run (data/<timestamp>_<session>.json)."""
+
+    meta: RunMeta
+    result: Any
+
+    @classmethod
+    def create(cls, user_id: str, session_id: str, result: Any) -> "RunRecord":
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return cls(
+            meta=RunMeta(
+                app_name="vega-agent",
+                user_id=user_id,
+                session_id=session_id,
+                created_at=now.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            ),
+            result=result,
+        )
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON. Dataclasses, pydantic models and sets are supported."""
+    try:
+        return orjson.dumps(value, default=_default, option=DUMPS_OPTIONS)
+    except orjson.JSONEncodeError:
+        # orjson rejects integers beyond 64 bits, which model output can contain.
+        return json.dumps(
+            value, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data)
+
+
+def _persist_zstd() -> bool:
+    mode = (os.getenv("PERSIST_COMPRESSION") or "none").strip().lower()
+    if mode != "zstd":
+        return False
+    if zstandard is None:
+        logger.warning("zstandard not installed; persisting uncompressed JSON")
+        return False
+    return True
+
+
+def write_payload(path: Path, value: Any) -> Path:
+    """Writes `value` to `path` (or `path`.zst when compressing); returns the path used."""
+    data = dumps(value)
+    if _persist_zstd():
+        path = path.with_name(path.name + ".zst")
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return path
+
+
+def append_lines(path: Path, values: Iterable[Any]) -> Path:
+    """Appends each value as one JSON line; a .zst log gets one frame per call."""
+    data = b"".join(dumps(value) + b"\n" for value in values)
+    if _persist_zstd():
+        path = path.with_name(path.name + ".zst")
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _append_lock, open(path, "ab") as f:
+        f.write(data)
+    return path
+
+
+def read_payload(path: Path) -> Any:
+    """Reads a file written by write_payload (plain or .zst)."""
+    path = Path(path)
+    data = path.read_bytes()
+    if path.name.endswith(".zst"):
+        data = _decompress_zstd(data)
+    return loads(data)
+
+
+def read_lines(path: Path) -> List[Any]:
+    """Reads a log written by append_lines (plain or .zst)."""
+    path = Path(path)
+    data = path.read_bytes()
+    if path.name.endswith(".zst"):
+        data = _decompress_zstd(data)
+    return [loads(line) for line in data.splitlines() if line.strip()]
+
+
+def _decompress_zstd(data: bytes) -> bytes:
+    if zstandard is None:
+        raise RuntimeError("zstandard is required to read .zst payloads")
+    reader = zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True)
+    with reader:
+        return reader.read()
+
+
+def select_fields(value: Any, fields: Sequence[str]) -> Any:
+    """Keeps only the given dotted paths (e.g. "metrics", "personas.name").
+
+    Lists are filtered element-wise; non-dict values are returned unchanged.
+    """
+    if not fields:
+        return value
+    tree: Dict[str, Any] = {}
+    for field in fields:
+        node = tree
+        for key in field.split("."):
+            node = node.setdefault(key, {})
+    return _prune(value, tree)
+
+
+def select_report_fields(result: Any, fields: Sequence[str]) -> Any:
+    """select_fields on the report a client sees.
+
+    The merger's answer arrives wrapped as {"output": {...}}, which the Next.js
+    proxy unwraps, so paths are applied inside "output" when it holds the
+    report; partial results are not wrapped and are filtered directly.
+    """
+    if isinstance(result, dict) and isinstance(result.get("output"), dict):
+        return {**result, "output": select_fields(result["output"], fields)}
+    return select_fields(result, fields)
+
+
+def _prune(value: Any, tree: Dict[str, Any]) -> Any:
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_prune(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _prune(value[key], sub) for key, sub in tree.items() if key in value}
+
+
+def parse_fields(raw: Optional[str]) -> List[str]:
+    return [f.strip() for f in (raw or "").split(",") if f.strip()]
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+def negotiate_encoding(header: Optional[str]) -> Optional[str]:
+    """Picks the best supported content coding from an Accept-Encoding header."""
+    accepted = _accepted_encodings(header or "")
+    available = [
+        name
+        for name, lib in (("br", brotli), ("zstd", zstandard), ("gzip", gzip))
+        if lib is not None
+    ]
+    best, best_q = None, 0.0
+    for name in available:
+        q = accepted.get(name, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    raise ValueError(f"unsupported encoding {encoding!r}")
+
+
+def json_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """Encodes `content` and compresses it per the request's Accept-Encoding."""
+    body = dumps(content)
+    headers = {"Vary": "Accept-Encoding"}
+    min_bytes = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024") or "1024")
+    if len(body) >= min_bytes:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+import admission
+from admission import AdmissionRejected, TenantQuota, admit
+from multi_tool_agent.rate_limit import FairScheduler, Flow, QueueFull
+
+INTERACTIVE = Flow(tenant="a", lane="interactive")
+BATCH = Flow(tenant="b", lane="batch")
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _grant_order(scheduler, holder, flows):
+    """Queues `flows` behind `holder`, then releases one slot at a time."""
+    order = []
+
+    async def run(flow):
+        await scheduler.acquire(flow)
+        order.append(flow)
+
+    await scheduler.acquire(holder)
+    tasks = [asyncio.create_task(run(flow)) for flow in flows]
+    await _settle()
+    scheduler.release(holder)
+    for flow in flows:
+        await _settle()
+        scheduler.release(order[-1])
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_interactive_work_overtakes_queued_batch_work():
+    scheduler = FairScheduler(1)
+    flows = [BATCH] * 4 + [INTERACTIVE] * 4
+    order = asyncio.run(_grant_order(scheduler, BATCH, flows))
+    assert order[:4] == [INTERACTIVE] * 4
+    assert scheduler.active == 0 and scheduler.waiting == 0
+
+
+def test_equal_weights_alternate_between_tenants():
+    scheduler = FairScheduler(1)
+    a, b = Flow(tenant="a"), Flow(tenant="b")
+    order = asyncio.run(_grant_order(scheduler, a, [a, a, a, b, b, b]))
+    tenants = [flow.tenant for flow in order]
+    assert all(x != y for x, y in zip(tenants, tenants[1:]))
+
+
+def test_per_tenant_cap_lets_other_tenants_through():
+    async def scenario():
+        scheduler = FairScheduler(2, max_per_tenant=1)
+        await scheduler.acquire(INTERACTIVE)
+        blocked = asyncio.create_task(scheduler.acquire(INTERACTIVE))
+        await _settle()
+        assert not blocked.done()
+        await asyncio.wait_for(scheduler.acquire(BATCH), 1)
+        scheduler.release(INTERACTIVE)
+        await asyncio.wait_for(blocked, 1)
+        assert scheduler.active == 2
+
+    asyncio.run(scenario())
+
+
+def test_queue_limit_raises_queue_full():
+    async def scenario():
+        scheduler = FairScheduler(1, max_waiting_per_tenant=1)
+        await scheduler.acquire(INTERACTIVE)
+        waiter = asyncio.create_task(scheduler.acquire(INTERACTIVE))
+        await _settle()
+        with pytest.raises(QueueFull):
+            await scheduler.acquire(INTERACTIVE)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_is_forgotten_and_slot_passes_on():
+    async def scenario():
+        scheduler = FairScheduler(1)
+        await scheduler.acquire(INTERACTIVE)
+        cancelled = asyncio.create_task(scheduler.acquire(BATCH))
+        other = Flow(tenant="c", lane="batch")
+        waiting = asyncio.create_task(scheduler.acquire(other))
+        await _settle()
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert scheduler.waiting == 1
+        assert BATCH not in scheduler._finish
+        scheduler.release(INTERACTIVE)
+        await asyncio.wait_for(waiting, 1)
+        scheduler.release(other)
+        assert scheduler.active == 0 and scheduler.waiting == 0
+        assert not scheduler._finish
+
+    asyncio.run(scenario())
+
+
+def _use(monkeypatch, quota, scheduler):
+    monkeypatch.setattr(admission, "get_quota", lambda: quota)
+    monkeypatch.setattr(admission, "get_run_scheduler", lambda: scheduler)
+
+
+def test_over_quota_fails_before_queueing(monkeypatch):
+    async def scenario():
+        quota = TenantQuota(1)
+        scheduler = FairScheduler(1)
+        _use(monkeypatch, quota, scheduler)
+        async with admit(INTERACTIVE):
+            # The slot is taken, yet the over-quota request is refused at once
+            # instead of waiting for it.
+            with pytest.raises(AdmissionRejected):
+                await asyncio.wait_for(admit(INTERACTIVE).__aenter__(), 1)
+            assert scheduler.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_requests_that_never_run_are_refunded(monkeypatch):
+    async def scenario():
+        quota = TenantQuota(3)
+        scheduler = FairScheduler(1, max_waiting_per_tenant=1)
+        _use(monkeypatch, quota, scheduler)
+
+        async def queued():
+            async with admit(INTERACTIVE):
+                pass
+
+        async with admit(INTERACTIVE):
+            waiter = asyncio.create_task(queued())
+            await _settle()
+            with pytest.raises(AdmissionRejected):
+                async with admit(INTERACTIVE):
+                    pass
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        # Only the run that actually held a slot is charged.
+        assert len(quota._starts["a"]) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,135 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from multi_tool_agent.agent import build_verdict_aggregator, interest_levels
+from multi_tool_agent.aggregation import (
+    VerdictAggregator,
+    aggregate_reviews,
+    partial_report,
+)
+
+ARCHETYPES = ["music", "news"]
+LEVELS = ["low", "high"]
+
+
+def _review(retention, viewed=True, liked=False):
+    return {"retention": retention, "viewed": viewed, "liked": liked}
+
+
+def _state():
+    return {
+        "music_low_review": _review(0.2, viewed=False),
+        "music_high_review": json.dumps(_review(0.6, liked=True)),
+        "news_low_review": _review(0.4),
+        "news_high_review": "not json",
+    }
+
+
+def test_overall_and_group_stats_are_exact():
+    stats = aggregate_reviews(_state(), ARCHETYPES, LEVELS)
+    assert stats["reviewers"] == 3
+    assert stats["expected_reviewers"] == 4
+    assert stats["missing"] == ["news_high"]
+    overall = stats["overall"]
+    assert overall["mean_retention"] == pytest.approx(0.4)
+    assert overall["median_retention"] == pytest.approx(0.4)
+    assert overall["view_rate"] == pytest.approx(2 / 3, abs=1e-4)
+    assert overall["like_rate"] == pytest.approx(1 / 3, abs=1e-4)
+    # 0.5 * retention + 0.25 * viewed + 0.25 * liked per reviewer.
+    assert overall["mean_score"] == pytest.approx((0.1 + 0.8 + 0.45) / 3, abs=1e-4)
+    assert stats["by_category"]["music"]["n"] == 2
+    assert stats["by_category"]["news"]["mean_retention"] == pytest.approx(0.4)
+    assert stats["by_level"]["high"]["n"] == 1
+
+
+def test_weighted_score_only_with_non_uniform_level_weights():
+    state = _state()
+    even = aggregate_reviews(state, ARCHETYPES, LEVELS, {"low": 2.0, "high": 2.0})
+    assert "weighted_score" not in even["overall"]
+    high = aggregate_reviews(state, ARCHETYPES, LEVELS, {"high": 10.0})
+    assert high["overall"]["weighted_score"] > high["overall"]["mean_score"]
+    assert high["level_weights"] == {"low": 1.0, "high": 10.0}
+
+
+def test_level_weights_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("REVIEW_LEVEL_WEIGHTS", "expert=3")
+    aggregator = build_verdict_aggregator()
+    assert aggregator.level_weights == {"expert": 3.0}
+    state = {
+        "music_beginner_review": _review(0.2),
+        "music_expert_review": _review(0.8),
+    }
+    overall = aggregate_reviews(
+        state, ["music"], interest_levels, aggregator.level_weights
+    )["overall"]
+    assert overall["weighted_score"] != overall["mean_score"]
+
+
+def test_per_reviewer_table_has_one_row_per_verdict():
+    table = aggregate_reviews(_state(), ARCHETYPES, LEVELS)["per_reviewer"]
+    assert table["columns"][:5] == ["vertical", "level", "retention", "viewed", "liked"]
+    assert table["rows"] == [
+        ["music", "low", 0.2, 0, 0, 0.1],
+        ["music", "high", 0.6, 1, 1, 0.8],
+        ["news", "low", 0.4, 1, 0, 0.45],
+    ]
+
+
+@pytest.mark.parametrize(
+    "state, expected",
+    [
+        ({"video_summary": "s", "video_transcript": "t"}, "s"),
+        ({"video_transcript": "t"}, "t"),
+        ({}, ""),
+    ],
+)
+def test_aggregator_passes_summary_or_transcript(state, expected):
+    aggregator = VerdictAggregator(
+        name="verdict_aggregator", archetypes=ARCHETYPES, levels=LEVELS
+    )
+    ctx = SimpleNamespace(
+        session=SimpleNamespace(state=state), invocation_id="inv", branch=None
+    )
+
+    async def run():
+        return [event async for event in aggregator._run_async_impl(ctx)]
+
+    [event] = asyncio.run(run())
+    assert event.actions.state_delta["video_context"] == expected
+    assert json.loads(event.actions.state_delta["review_stats"])["reviewers"] == 0
+
+
+def test_outliers_are_flagged_and_excluded_from_the_trimmed_mean():
+    archetypes = [f"a{i}" for i in range(10)]
+    state = {f"a{i}_x_review": _review(0.5 + 0.01 * i) for i in range(9)}
+    state["a9_x_review"] = _review(0.0)
+    stats = aggregate_reviews(state, archetypes, ["x"])
+    assert [o["reviewer"] for o in stats["outliers"]] == ["a9_x"]
+    assert stats["overall"]["trimmed_mean_retention"] == pytest.approx(0.54)
+
+
+def test_no_valid_reviews_reports_only_counts():
+    stats = aggregate_reviews({}, ARCHETYPES, LEVELS)
+    assert stats["reviewers"] == 0
+    assert len(stats["missing"]) == 4
+    assert "overall" not in stats
+
+
+def test_retention_is_clamped():
+    state = {"music_low_review": _review(1.7)}
+    stats = aggregate_reviews(state, ["music"], ["low"])
+    assert stats["overall"]["mean_retention"] == 1.0
+
+
+def test_partial_report_lists_received_verdicts():
+    report = partial_report({**_state(), "video_summary": "s"}, ARCHETYPES, LEVELS)
+    assert report["video_summary"] == "s"
+    assert [(p["vertical"], p["level"]) for p in report["personas"]] == [
+        ("music", "low"),
+        ("music", "high"),
+        ("news", "low"),
+    ]
+    assert report["review_stats"]["reviewers"] == 3
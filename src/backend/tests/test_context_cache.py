@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from context_cache import ContextCachePlugin
+
+PERSONA = "You are a music expert."
+TOOL = types.FunctionDeclaration(name="summarize")
+
+
+class FakeCaches:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+
+    async def create(self, model, config):
+        await asyncio.sleep(0.01)  # let concurrent reviewers pile up
+        if self.fail:
+            raise RuntimeError("quota")
+        self.created.append(config)
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+
+def _plugin(caches):
+    client = SimpleNamespace(aio=SimpleNamespace(caches=caches))
+    return ContextCachePlugin(client=client)
+
+
+def _request(instruction=PERSONA, media=b"x" * 8000, tools=None):
+    return LlmRequest(
+        model="gemini-2.0-flash-lite",
+        contents=[
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part(text="Review this video"),
+                    types.Part(
+                        inline_data=types.Blob(mime_type="video/mp4", data=media)
+                    ),
+                ],
+            ),
+            types.Content(role="model", parts=[types.Part(text="transcript")]),
+        ],
+        config=types.GenerateContentConfig(
+            system_instruction=instruction, tools=tools
+        ),
+    )
+
+
+async def _before(plugin, request, agent="music_expert_reviewer"):
+    context = SimpleNamespace(agent_name=agent, invocation_id="inv-1")
+    return await plugin.before_model_callback(
+        callback_context=context, llm_request=request
+    )
+
+
+@pytest.fixture(autouse=True)
+def small_caches(monkeypatch):
+    monkeypatch.setenv("CONTEXT_CACHE", "1")
+    monkeypatch.setenv("CONTEXT_CACHE_MIN_TOKENS", "10")
+
+
+def test_concurrent_reviewers_share_one_cache():
+    caches = FakeCaches()
+    plugin = _plugin(caches)
+    requests = [_request(instruction=f"persona {i}") for i in range(27)]
+
+    async def run():
+        await asyncio.gather(*(_before(plugin, r) for r in requests))
+
+    asyncio.run(run())
+    assert len(caches.created) == 1
+    assert {r.config.cached_content for r in requests} == {"cachedContents/1"}
+
+
+def test_request_is_rewritten_to_reference_the_cache():
+    request = _request()
+    assert asyncio.run(_before(_plugin(FakeCaches()), request)) is None
+    assert request.config.cached_content == "cachedContents/1"
+    assert request.config.system_instruction is None
+    assert [c.role for c in request.contents] == ["user"]
+    [part] = request.contents[0].parts
+    assert part.text == PERSONA and part.inline_data is None
+
+
+@pytest.mark.parametrize(
+    "agent, request_kwargs",
+    [
+        ("merger_agent", {}),
+        ("music_expert_reviewer", {"media": b"x"}),
+        (
+            "music_expert_reviewer",
+            {"tools": [types.Tool(function_declarations=[TOOL])]},
+        ),
+    ],
+)
+def test_other_requests_pass_through_unchanged(agent, request_kwargs):
+    caches = FakeCaches()
+    request = _request(**request_kwargs)
+    before = request.model_dump()
+    asyncio.run(_before(_plugin(caches), request, agent=agent))
+    assert request.model_dump() == before
+    assert not caches.created
+
+
+def test_failed_creation_falls_back_to_the_full_request():
+    request = _request()
+    before = request.model_dump()
+    plugin = _plugin(FakeCaches(fail=True))
+    assert asyncio.run(_before(plugin, request)) is None
+    assert request.model_dump() == before
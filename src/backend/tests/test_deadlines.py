@@ -0,0 +1,66 @@
+import asyncio
+from types import SimpleNamespace
+
+from context_cache import ContextCachePlugin
+from deadlines import InvocationTracker, release_invocations, run_invocations
+from metrics import MetricsPlugin
+from tracing import TracingPlugin
+
+
+def test_tracker_records_invocations_of_the_current_run():
+    async def scenario():
+        tracker = InvocationTracker()
+        await tracker.before_run_callback(
+            invocation_context=SimpleNamespace(invocation_id="outside")
+        )
+        invocations = set()
+        run_invocations.set(invocations)
+        for invocation_id in ("e-1", "e-2"):
+            await tracker.before_run_callback(
+                invocation_context=SimpleNamespace(invocation_id=invocation_id)
+            )
+        return invocations
+
+    assert asyncio.run(scenario()) == {"e-1", "e-2"}
+
+
+def test_release_frees_plugin_state_and_survives_failures():
+    metrics, tracing = MetricsPlugin(), TracingPlugin()
+    metrics._agent_starts[("e-1", "a")] = 1.0
+    metrics._model_starts[("e-2", "a")] = (1.0, "m")
+    metrics._model_starts[("other", "a")] = (1.0, "m")
+    tracing._calls[("e-1", "a")] = 3
+    tracing._pending[("e-1", "a")] = {}
+
+    class Broken(MetricsPlugin):
+        async def release_invocation(self, invocation_id):
+            raise RuntimeError("boom")
+
+    plugins = [Broken("broken"), InvocationTracker(), metrics, tracing]
+    asyncio.run(release_invocations(plugins, {"e-1", "e-2"}))
+    assert not metrics._agent_starts
+    assert list(metrics._model_starts) == [("other", "a")]
+    assert not tracing._calls and not tracing._pending
+
+
+def test_context_caches_are_deleted_once_creation_finishes():
+    deleted = []
+
+    async def delete(name):
+        deleted.append(name)
+
+    client = SimpleNamespace(aio=SimpleNamespace(caches=SimpleNamespace(delete=delete)))
+
+    async def scenario():
+        plugin = ContextCachePlugin(client=client)
+        loop = asyncio.get_running_loop()
+        done, pending, failed = (loop.create_future() for _ in range(3))
+        done.set_result("cachedContents/1")
+        failed.set_result(None)
+        plugin._caches["e-1"] = {"a": done, "b": pending, "c": failed}
+        loop.call_later(0.01, pending.set_result, "cachedContents/2")
+        await plugin.release_invocation("e-1")
+        assert "e-1" not in plugin._caches
+
+    asyncio.run(scenario())
+    assert deleted == ["cachedContents/1", "cachedContents/2"]
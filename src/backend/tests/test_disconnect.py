@@ -0,0 +1,61 @@
+import asyncio
+
+import uvicorn
+from fastapi.testclient import TestClient
+
+import main
+from admission import get_run_scheduler
+from metrics import REQUESTS
+
+
+def test_closing_the_connection_cancels_the_run(monkeypatch):
+    monkeypatch.setenv("DISCONNECT_POLL_SEC", "0.05")
+
+    async def scenario():
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def slow_pipeline(*args):
+            started.set()
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        monkeypatch.setattr(main, "_run_pipeline", slow_pipeline)
+        server = uvicorn.Server(
+            uvicorn.Config(main.app, host="127.0.0.1", port=0, log_level="warning")
+        )
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            body = b"prompt=hello"
+            writer.write(
+                b"POST /agent/run HTTP/1.1\r\nHost: test\r\n"
+                b"Content-Type: application/x-www-form-urlencoded\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (len(body), body)
+            )
+            await writer.drain()
+            await asyncio.wait_for(started.wait(), 5)
+            writer.close()
+            await asyncio.wait_for(cancelled.wait(), 5)
+            await asyncio.sleep(0.05)
+            assert get_run_scheduler().active == 0
+        finally:
+            server.should_exit = True
+            await serving
+
+    asyncio.run(scenario())
+
+
+def test_request_id_and_count_middlewares():
+    counter = REQUESTS.labels(method="GET", route="/health", status="200")
+    before = counter._value.get()
+    with TestClient(main.app) as client:
+        response = client.get("/health", headers={"X-Request-ID": "abc"})
+        assert response.headers["X-Request-ID"] == "abc"
+        assert client.get("/health").headers["X-Request-ID"]
+    assert counter._value.get() == before + 2
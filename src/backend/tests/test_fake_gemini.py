@@ -0,0 +1,28 @@
+from bench import fake_gemini
+
+
+def _draws(order):
+    fake_gemini._key_counts.clear()
+    return {name: fake_gemini._rng_for(body).random() for name, body in order}
+
+
+def _body(agent: str, cache: str) -> dict:
+    return {
+        "contents": [{"role": "user", "parts": [{"text": "Review this"}]}],
+        "systemInstruction": {"parts": [{"text": f"You are {agent}"}]},
+        "cachedContent": cache,
+    }
+
+
+def test_rng_does_not_depend_on_arrival_order_or_cache_name():
+    a, b = ("a", _body("music", "cachedContents/1")), ("b", _body("news", "x/2"))
+    first = _draws([a, b])
+    assert first == _draws([b, a])
+    renamed = ("a", _body("music", "cachedContents/other"))
+    assert _draws([renamed])["a"] == first["a"]
+
+
+def test_repeated_request_draws_independently():
+    body = _body("music", "c")
+    fake_gemini._key_counts.clear()
+    assert fake_gemini._rng_for(body).random() != fake_gemini._rng_for(body).random()
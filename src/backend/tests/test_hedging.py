@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from google.adk.models import LlmRequest
+
+from multi_tool_agent import models
+from multi_tool_agent.hedging import HedgeBudget, HedgingPolicy, LatencyTracker
+from multi_tool_agent.models import HedgedGemini
+
+
+def test_percentile_uses_the_rolling_window():
+    tracker = LatencyTracker(window=10)
+    assert tracker.percentile(95) is None
+    for seconds in range(1, 21):
+        tracker.record(float(seconds))
+    assert len(tracker) == 10
+    assert tracker.percentile(0) == 11.0
+    assert tracker.percentile(50) == 16.0
+    assert tracker.percentile(95) == 20.0
+    assert tracker.percentile(100) == 20.0
+
+
+def test_budget_allows_ratio_of_calls_up_to_burst():
+    budget = HedgeBudget(ratio=0.25, burst=2)
+    spent = 0
+    for _ in range(40):
+        budget.on_call()
+        spent += budget.try_spend()
+    assert spent == 10
+    idle = HedgeBudget(ratio=0.5, burst=2)
+    for _ in range(100):
+        idle.on_call()
+    assert [idle.try_spend() for _ in range(3)] == [True, True, False]
+
+
+def test_hedge_delay_needs_samples_and_respects_minimum():
+    policy = HedgingPolicy(enabled=True, min_samples=3, min_delay_sec=0.5)
+    assert policy.hedge_delay("m") is None
+    for seconds in (0.1, 0.2, 0.3):
+        policy.record("m", seconds)
+    assert policy.hedge_delay("m") == 0.5
+    policy.record("m", 2.0)
+    assert policy.hedge_delay("m") == 2.0
+    assert HedgingPolicy(enabled=False).hedge_delay("m") is None
+
+
+def test_winning_hedge_records_request_latency(monkeypatch):
+    """A slow primary beaten by a fast hedge must not be recorded as fast."""
+    policy = HedgingPolicy(enabled=True, budget_ratio=1.0, min_delay_sec=0.0)
+    policy.budget.on_call()
+    monkeypatch.setattr(models, "get_hedging_policy", lambda: policy)
+    durations = iter([1.0, 0.05])  # primary, then hedge
+
+    async def generate_once(self, llm_request, on_sent=None):
+        if on_sent is not None:
+            on_sent()
+        await asyncio.sleep(next(durations))
+        return []
+
+    monkeypatch.setattr(HedgedGemini, "_generate_once", generate_once)
+    model = HedgedGemini(model="m")
+    asyncio.run(model._hedged(LlmRequest(model="m"), delay=0.1))
+    recorded = policy._tracker("m").percentile(100)
+    assert recorded == pytest.approx(0.15, abs=0.05)
+
+
+@pytest.mark.parametrize("primary_sec, copies", [(0.01, 0), (1.0, 1)])
+def test_request_is_copied_only_for_an_issued_hedge(monkeypatch, primary_sec, copies):
+    policy = HedgingPolicy(enabled=True, budget_ratio=1.0, min_delay_sec=0.0)
+    policy.budget.on_call()
+    monkeypatch.setattr(models, "get_hedging_policy", lambda: policy)
+    durations = iter([primary_sec, 0.01])
+    made = []
+    model_copy = LlmRequest.model_copy
+
+    def counting_copy(self, *args, **kwargs):
+        made.append(self)
+        return model_copy(self, *args, **kwargs)
+
+    async def generate_once(self, llm_request, on_sent=None):
+        if on_sent is not None:
+            on_sent()
+        await asyncio.sleep(next(durations))
+        return []
+
+    monkeypatch.setattr(LlmRequest, "model_copy", counting_copy)
+    monkeypatch.setattr(HedgedGemini, "_generate_once", generate_once)
+    asyncio.run(HedgedGemini(model="m")._hedged(LlmRequest(model="m"), delay=0.1))
+    assert len(made) == copies
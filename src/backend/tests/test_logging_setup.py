@@ -0,0 +1,45 @@
+import json
+import logging
+import queue
+
+from logging_setup import JsonFormatter, StructuredQueueHandler, truncate_middle
+
+
+def _raise_deep(depth: int) -> None:
+    if depth == 0:
+        raise ValueError("the real cause")
+    _raise_deep(depth - 1)
+
+
+def _log_through_queue(formatter: logging.Formatter) -> str:
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    logger = logging.getLogger("tests.logging_setup")
+    logger.handlers = [StructuredQueueHandler(log_queue)]
+    logger.propagate = False
+    try:
+        _raise_deep(200)
+    except ValueError:
+        logger.exception("run %s failed", "abc")
+    return formatter.format(log_queue.get_nowait())
+
+
+def test_truncate_middle_keeps_both_ends():
+    text = "head-" + "x" * 5000 + "-tail"
+    short = truncate_middle(text, 100)
+    assert short.startswith("head-")
+    assert short.endswith("-tail")
+    assert len(short) < 200
+    assert truncate_middle("short", 100) == "short"
+
+
+def test_json_exception_lands_in_exc_and_keeps_its_last_line():
+    entry = json.loads(_log_through_queue(JsonFormatter()))
+    assert entry["msg"] == "run abc failed"
+    assert entry["exc"].startswith("Traceback")
+    assert entry["exc"].endswith("ValueError: the real cause")
+
+
+def test_text_format_still_renders_the_traceback():
+    line = _log_through_queue(logging.Formatter("%(message)s"))
+    assert line.startswith("run abc failed\nTraceback")
+    assert line.endswith("ValueError: the real cause")
@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+from prometheus_client import REGISTRY
+
+from metrics import MetricsPlugin
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _context(agent, invocation="inv-1"):
+    return SimpleNamespace(invocation_id=invocation, agent_name=agent)
+
+
+def _response(prompt=100, output=20, cached=0, partial=None):
+    return LlmResponse(
+        partial=partial,
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt,
+            candidates_token_count=output,
+            cached_content_token_count=cached,
+        ),
+    )
+
+
+def _call(plugin, agent, *responses):
+    async def run():
+        context = _context(agent)
+        await plugin.before_model_callback(
+            callback_context=context, llm_request=LlmRequest(model="m")
+        )
+        for response in responses:
+            await plugin.after_model_callback(
+                callback_context=context, llm_response=response
+            )
+
+    asyncio.run(run())
+
+
+def test_tokens_and_duration_are_recorded_per_agent_and_model():
+    agent = "metrics_tokens_reviewer"
+    _call(MetricsPlugin(), agent, _response(prompt=100, output=20, cached=80))
+    labels = dict(agent=agent, model="m")
+    assert _value("vega_llm_tokens_total", direction="input", **labels) == 100
+    assert _value("vega_llm_tokens_total", direction="output", **labels) == 20
+    assert _value("vega_llm_tokens_total", direction="cached", **labels) == 80
+    assert _value("vega_llm_call_duration_seconds_count", **labels) == 1
+
+
+def test_one_call_is_counted_once():
+    # Partial chunks repeat the usage so far, and a second response for the
+    # same call (e.g. a hedge's duplicate) finds no pending start.
+    agent = "metrics_once_reviewer"
+    _call(
+        MetricsPlugin(),
+        agent,
+        _response(prompt=100, output=5, partial=True),
+        _response(prompt=100, output=20),
+        _response(prompt=100, output=20),
+    )
+    labels = dict(agent=agent, model="m")
+    assert _value("vega_llm_tokens_total", direction="input", **labels) == 100
+    assert _value("vega_llm_tokens_total", direction="output", **labels) == 20
+    assert _value("vega_llm_call_duration_seconds_count", **labels) == 1
+
+
+class RateLimited(Exception):
+    code = 429
+
+
+def test_errors_count_rate_limits_and_clear_the_timer():
+    agent = "metrics_error_reviewer"
+    plugin = MetricsPlugin()
+
+    async def run():
+        context = _context(agent)
+        request = LlmRequest(model="m")
+        for error in (RateLimited("quota"), ValueError("bad")):
+            await plugin.before_model_callback(
+                callback_context=context, llm_request=request
+            )
+            await plugin.on_model_error_callback(
+                callback_context=context, llm_request=request, error=error
+            )
+        # A late response for the failed call is not recorded.
+        await plugin.after_model_callback(
+            callback_context=context, llm_response=_response()
+        )
+
+    asyncio.run(run())
+    labels = dict(agent=agent, model="m")
+    assert _value("vega_llm_rate_limited_total", **labels) == 1
+    assert _value("vega_llm_errors_total", code="429", **labels) == 1
+    assert _value("vega_llm_errors_total", code="ValueError", **labels) == 1
+    assert _value("vega_llm_call_duration_seconds_count", **labels) == 0
+    assert _value("vega_llm_tokens_total", direction="input", **labels) == 0
+    assert not plugin._model_starts
+
+
+def test_agent_duration_is_observed_once_per_run_of_the_agent():
+    plugin = MetricsPlugin()
+    agent = SimpleNamespace(name="metrics_duration_agent")
+
+    async def run():
+        context = _context(agent.name)
+        await plugin.before_agent_callback(agent=agent, callback_context=context)
+        await plugin.after_agent_callback(agent=agent, callback_context=context)
+        await plugin.after_agent_callback(agent=agent, callback_context=context)
+
+    asyncio.run(run())
+    assert _value("vega_agent_duration_seconds_count", agent=agent.name) == 1
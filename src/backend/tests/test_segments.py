@@ -0,0 +1,161 @@
+import asyncio
+from types import SimpleNamespace
+from typing import AsyncGenerator, ClassVar, List, Tuple
+
+from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from main import segment_windows
+from multi_tool_agent.agent import build_transcription_agent
+from multi_tool_agent.transcription import (
+    ReviewerClipPlugin,
+    segment_marker,
+    stitch_transcripts,
+)
+
+
+def test_short_video_is_one_window():
+    assert segment_windows(42.0, 60, 5) == [(0.0, 42.0)]
+    assert segment_windows(60.0, 60, 5) == [(0.0, 60.0)]
+
+
+def test_windows_overlap_and_cover_the_video():
+    windows = segment_windows(170.0, 60, 5)
+    assert windows == [(0.0, 60.0), (55.0, 115.0), (110.0, 170.0)]
+
+
+def test_tail_shorter_than_overlap_is_merged():
+    assert segment_windows(115.02, 60, 5) == [(0.0, 60.0), (55.0, 115.02)]
+    assert segment_windows(228.0, 60, 5)[-1] == (165.0, 228.0)
+
+
+def test_tail_longer_than_overlap_gets_its_own_window():
+    assert segment_windows(121.0, 60, 5)[-1] == (110.0, 121.0)
+
+
+def _request(count: int) -> LlmRequest:
+    parts = []
+    for index in range(1, count + 1):
+        parts.append(types.Part(text=segment_marker(index, count, 0.0, 60.0)))
+        parts.append(
+            types.Part(inline_data=types.Blob(mime_type="video/mp4", data=b"x"))
+        )
+    parts.append(types.Part(text="Review this video"))
+    return LlmRequest(contents=[types.Content(role="user", parts=parts)])
+
+
+def _filter(agent_name: str, request: LlmRequest) -> list:
+    plugin = ReviewerClipPlugin()
+    context = SimpleNamespace(agent_name=agent_name)
+    asyncio.run(
+        plugin.before_model_callback(callback_context=context, llm_request=request)
+    )
+    return request.contents[0].parts
+
+
+def test_reviewers_receive_only_the_first_clip():
+    parts = _filter("music_high_reviewer", _request(3))
+    assert sum(part.inline_data is not None for part in parts) == 1
+    assert parts[0].text.startswith("[video segment 1/3")
+    assert parts[-1].text == "Review this video"
+
+
+def test_other_agents_keep_every_clip():
+    parts = _filter("merger_agent", _request(3))
+    assert sum(part.inline_data is not None for part in parts) == 3
+
+
+def test_stitch_removes_the_overlap_once_and_keeps_line_breaks():
+    first = "[00:00] Welcome back everyone.\n[00:50] Today we cook pasta with garlic"
+    second = "[00:00] we cook pasta with garlic and olive oil.\n[00:05] Enjoy!"
+    stitched = stitch_transcripts([(55.0, second), (0.0, first)])
+    assert stitched == (
+        "[00:00] Welcome back everyone.\n"
+        "[00:50] Today we cook pasta with garlic and olive oil.\n"
+        "[01:00] Enjoy!"
+    )
+
+
+def test_stitch_without_overlap_keeps_both_pieces():
+    stitched = stitch_transcripts([(0.0, "Line one.\nLine two."), (55.0, "Other text.")])
+    assert stitched == "Line one.\nLine two.\nOther text."
+
+
+def test_stitch_needs_a_long_enough_match():
+    stitched = stitch_transcripts([(0.0, "we cook pasta"), (55.0, "we cook pasta")])
+    assert stitched == "we cook pasta\nwe cook pasta"
+
+
+def test_stitch_skips_empty_pieces():
+    assert stitch_transcripts([(0.0, ""), (55.0, " hello "), (110.0, None)]) == "hello"
+
+
+class RecordingLlm(BaseLlm):
+    requests: ClassVar[List[Tuple[str, LlmRequest]]] = []
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        RecordingLlm.requests.append((self.model, llm_request))
+        text = "summary"
+        if self.model == "transcriber":
+            marker = llm_request.contents[0].parts[0].text
+            text = f"words of {marker} spoken here"
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)])
+        )
+
+
+def _request_text(llm_request: LlmRequest) -> str:
+    texts = [str(llm_request.config.system_instruction or "")]
+    for content in llm_request.contents:
+        texts.extend(part.text or "" for part in content.parts or [])
+    return "\n".join(texts)
+
+
+def test_stitched_summarizer_receives_the_transcript_once():
+    RecordingLlm.requests.clear()
+    transcriber = LlmAgent(
+        name="VideoTranscriber",
+        model=RecordingLlm(model="transcriber"),
+        instruction="Transcribe.",
+        output_key="video_transcript",
+    )
+    summarizer = LlmAgent(
+        name="VideoSummarizer",
+        model=RecordingLlm(model="summarizer"),
+        instruction="Summarize the transcript.",
+        output_key="video_summary",
+    )
+    agent = build_transcription_agent(transcriber, summarizer)
+    runner = InMemoryRunner(agent=agent, app_name="test")
+    parts = []
+    for index, (start, end) in enumerate([(0.0, 60.0), (55.0, 90.0)], start=1):
+        parts.append(types.Part(text=segment_marker(index, 2, start, end)))
+        parts.append(
+            types.Part(inline_data=types.Blob(mime_type="video/mp4", data=b"v"))
+        )
+
+    async def run():
+        session = await runner.session_service.create_session(
+            app_name="test", user_id="u"
+        )
+        async for _ in runner.run_async(
+            user_id="u",
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=parts),
+        ):
+            pass
+        session = await runner.session_service.get_session(
+            app_name="test", user_id="u", session_id=session.id
+        )
+        return session.state["video_transcript"]
+
+    transcript = asyncio.run(run())
+    [request] = [r for model, r in RecordingLlm.requests if model == "summarizer"]
+    assert _request_text(request).count(transcript) == 1
+    assert not any(
+        part.inline_data for c in request.contents for part in c.parts or []
+    )
@@ -0,0 +1,70 @@
+import pytest
+
+import serialization
+from serialization import (
+    negotiate_encoding,
+    parse_fields,
+    select_fields,
+    select_report_fields,
+)
+
+REPORT = {
+    "metrics": {"views": 10, "likes": 2},
+    "personas": [
+        {"name": "Ann", "level": "expert"},
+        {"name": "Bo", "level": "beginner"},
+    ],
+    "video": {"title": "t"},
+}
+
+
+def test_select_fields_keeps_dotted_paths_and_filters_lists():
+    assert select_fields(REPORT, ["metrics.likes", "personas.name"]) == {
+        "metrics": {"likes": 2},
+        "personas": [{"name": "Ann"}, {"name": "Bo"}],
+    }
+
+
+def test_select_fields_ignores_unknown_paths_and_scalars():
+    assert select_fields(REPORT, ["nope", "video.title.deeper"]) == {
+        "video": {"title": "t"}
+    }
+    assert select_fields("text", ["metrics"]) == "text"
+    assert select_fields(REPORT, []) is REPORT
+
+
+def test_report_fields_apply_inside_output():
+    result = {"output": REPORT}
+    assert select_report_fields(result, ["metrics.views"]) == {
+        "output": {"metrics": {"views": 10}}
+    }
+    partial = {"personas": REPORT["personas"], "video_summary": "s"}
+    assert select_report_fields(partial, ["video_summary"]) == {"video_summary": "s"}
+
+
+def test_parse_fields_drops_blanks():
+    assert parse_fields(" metrics, ,personas.name ,") == ["metrics", "personas.name"]
+    assert parse_fields(None) == []
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("zstd, gzip", "zstd"),
+        ("br;q=0, gzip;q=0", None),
+        ("*", "br"),
+        ("identity", None),
+        ("gzip;q=bogus, zstd;q=0.1", "zstd"),
+        (None, None),
+    ],
+)
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_skips_missing_libraries(monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", None)
+    monkeypatch.setattr(serialization, "zstandard", None)
+    assert negotiate_encoding("br, zstd, gzip;q=0.1") == "gzip"
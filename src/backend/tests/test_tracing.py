@@ -0,0 +1,90 @@
+from typing import AsyncGenerator
+
+import pytest
+from fastapi.testclient import TestClient
+from google.adk.agents import LlmAgent
+from google.adk.apps import App
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+import main
+from deadlines import InvocationTracker
+from tracing import TracingPlugin
+
+
+class FakeLlm(BaseLlm):
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        yield LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(text='{"output": {"ok": true}}')]
+            ),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=120,
+                candidates_token_count=8,
+                cached_content_token_count=100,
+            ),
+        )
+
+
+@pytest.fixture
+def spans(monkeypatch, tmp_path):
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider()
+        trace.set_tracer_provider(provider)
+    exporter = InMemorySpanExporter()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    agent = LlmAgent(name="merger_agent", model=FakeLlm(model="fake-model"))
+    app = App(
+        name="vega-agent",
+        root_agent=agent,
+        plugins=[InvocationTracker(), TracingPlugin()],
+    )
+    monkeypatch.setattr(main, "get_agent_app", lambda: app)
+    monkeypatch.setattr(main, "DATA_DIR", tmp_path)
+    yield exporter
+    exporter.shutdown()
+
+
+def test_model_attributes_land_on_the_call_llm_span(spans):
+    with TestClient(main.app) as client:
+        response = client.post("/agent/run", data={"prompt": "hello"})
+    assert response.status_code == 200
+
+    [call] = [s for s in spans.get_finished_spans() if s.name == "call_llm"]
+    assert call.attributes["vega.agent"] == "merger_agent"
+    assert call.attributes["vega.llm.model"] == "fake-model"
+    assert call.attributes["vega.llm.call_index"] == 1
+    assert call.attributes["vega.llm.payload_bytes"] == 0
+    assert call.attributes["vega.llm.input_tokens"] == 120
+    assert call.attributes["vega.llm.output_tokens"] == 8
+    assert call.attributes["vega.llm.cached_tokens"] == 100
+
+
+def test_stage_spans_nest_under_the_request_span(spans):
+    with TestClient(main.app) as client:
+        client.post("/agent/run", data={"prompt": "hello"})
+
+    finished = spans.get_finished_spans()
+    by_id = {s.context.span_id: s for s in finished}
+    [request] = [s for s in finished if s.name == "agent.run"]
+
+    def under_request(span):
+        while span.parent is not None:
+            if span.parent.span_id == request.context.span_id:
+                return True
+            span = by_id[span.parent.span_id]
+        return False
+
+    names = {"adk.run", "call_llm", "json_extraction", "persist", "encode_response"}
+    nested = {s.name for s in finished if s.name in names and under_request(s)}
+    assert nested == names
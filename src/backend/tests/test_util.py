@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+from multi_tool_agent import util
+
+
+def _bundle(monkeypatch, tmp_path, text="Be brief."):
+    path = tmp_path / "prompt.txt"
+    path.write_text(text, encoding="utf-8")
+    st = os.stat(path)
+    entry = {
+        "sha256": util.content_hash(text),
+        "text": text,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+    monkeypatch.setattr(util, "_load_bundle", lambda: {"./prompt.txt": entry})
+    return path
+
+
+def test_bundle_is_used_when_only_the_mtime_changed(monkeypatch, tmp_path):
+    path = _bundle(monkeypatch, tmp_path)
+    os.utime(path, ns=(1, 1))
+    assert util._from_bundle("./prompt.txt", str(path)) == "Be brief."
+
+
+def test_edited_file_makes_the_bundle_stale(monkeypatch, tmp_path):
+    path = _bundle(monkeypatch, tmp_path)
+    path.write_text("Be long.", encoding="utf-8")  # same size, new content
+    os.utime(path, ns=(1, 1))
+    assert util._from_bundle("./prompt.txt", str(path)) is None
+    path.write_text("Be much longer.", encoding="utf-8")
+    assert util._from_bundle("./prompt.txt", str(path)) is None
+
+
+def test_importing_the_agent_module_does_not_build_the_pipeline():
+    code = (
+        "import multi_tool_agent.agent as agent\n"
+        "assert agent.get_pipeline.cache_info().currsize == 0\n"
+        "root = agent.root_agent\n"
+        "assert agent.get_pipeline.cache_info().currsize == 1\n"
+        "assert root is agent.get_root_agent()\n"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code], cwd=backend, check=True
+    )
@@ -0,0 +1,188 @@
+"""OpenTelemetry tracing for the agent backend.
+
+ADK already opens spans for every agent run (``agent_run [name]``) and model
+call (``call_llm``); this module installs an SDK tracer provider so those spans
+are exported alongside the backend's own (fetch, transcode, encode, extraction,
+persistence), and decorates ADK's spans with model/token/payload attributes.
+
+Configuration (environment):
+- TRACE_EXPORTER: "none" (default), "file", "otlp" or "console".
+- TRACE_FILE: JSON-lines output for the file exporter (default data/traces.jsonl).
+- OTEL_EXPORTER_OTLP_ENDPOINT / OTEL_SERVICE_NAME: standard OTLP settings.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+
+# ADK
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer("vega.backend")
+
+DEFAULT_TRACE_FILE = Path(__file__).parent / "data" / "traces.jsonl"
+
+_configured = False
+
+
+class JsonFileSpanExporter(SpanExporter):
+    """Appends finished spans to a JSON-lines file for offline analysis."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = [
+            json.dumps(json.loads(span.to_json()), separators=(",", ":"))
+            for span in spans
+        ]
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _build_exporter(kind: str) -> Optional[SpanExporter]:
+    if kind == "file":
+        return JsonFileSpanExporter(Path(os.getenv("TRACE_FILE") or DEFAULT_TRACE_FILE))
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            logger.warning("OTLP exporter not installed; writing traces to file")
+            return _build_exporter("file")
+        # Export failures (no collector listening) are logged by the SDK and dropped.
+        return OTLPSpanExporter()
+    return None
+
+
+def configure_tracing() -> None:
+    """Installs the SDK tracer provider once per process, per TRACE_EXPORTER."""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    kind = (os.getenv("TRACE_EXPORTER") or "none").strip().lower()
+    exporter = _build_exporter(kind)
+    if exporter is None:
+        return
+    if not isinstance(trace.get_tracer_provider(), trace.ProxyTracerProvider):
+        # Someone (e.g. `adk web --trace_to_cloud`) already installed a provider.
+        return
+
+    service_name = os.getenv("OTEL_SERVICE_NAME") or "vega-agent-backend"
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+def inline_payload_bytes(llm_request: LlmRequest) -> int:
+    """Size of inline media carried by a model request."""
+    total = 0
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            blob = getattr(part, "inline_data", None)
+            if blob is not None and blob.data:
+                total += len(blob.data)
+    return total
+
+
+class TracingPlugin(BasePlugin):
+    """Adds agent, model, token and payload attributes to ADK's call_llm spans.
+
+    ADK runs before_model_callback before it opens the call_llm span, so the
+    request's attributes are stashed there and set once the span is current
+    (after_model_callback / on_model_error_callback).
+    """
+
+    def __init__(self, name: str = "tracing"):
+        super().__init__(name)
+        # Model calls so far per (invocation_id, agent_name); an agent that
+        # loops through tools makes several. These are not retries.
+        self._calls: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._pending: Dict[Tuple[str, str], Dict[str, object]] = {}
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ):
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        self._calls[key] += 1
+        self._pending[key] = {
+            "vega.agent": callback_context.agent_name,
+            "vega.llm.model": llm_request.model or "unknown",
+            "vega.llm.call_index": self._calls[key],
+            "vega.llm.payload_bytes": inline_payload_bytes(llm_request),
+        }
+        return None
+
+    def _annotate_call(self, callback_context: CallbackContext):
+        """Returns the current call_llm span with the stashed request attributes."""
+        span = trace.get_current_span()
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        for name, value in self._pending.pop(key, {}).items():
+            span.set_attribute(name, value)
+        return span
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ):
+        span = self._annotate_call(callback_context)
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            span.set_attribute("vega.llm.input_tokens", usage.prompt_token_count or 0)
+            span.set_attribute(
+                "vega.llm.output_tokens", usage.candidates_token_count or 0
+            )
+            span.set_attribute(
+                "vega.llm.cached_tokens", usage.cached_content_token_count or 0
+            )
+        return None
+
+    async def on_model_error_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_request: LlmRequest,
+        error: Exception,
+    ):
+        span = self._annotate_call(callback_context)
+        span.record_exception(error)
+        span.set_status(trace.Status(trace.StatusCode.ERROR, str(error)))
+        return None
+
+    async def release_invocation(self, invocation_id: str) -> None:
+        for store in (self._calls, self._pending):
+            for key in [k for k in store if k[0] == invocation_id]:
+                store.pop(key, None)
+
+    async def after_run_callback(self, *, invocation_context) -> None:
+        await self.release_invocation(invocation_context.invocation_id)